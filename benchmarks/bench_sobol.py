@@ -0,0 +1,61 @@
+"""
+Benchmark of the Sobol point generators used by ``sampling_method='sobol'``.
+
+Compares the points generated per second by the bulk Gray code generator
+``Sobol.i4_sobol_generate`` with the previous per-seed loop over
+``Sobol.i4_sobol``.
+
+Usage (with shgo installed or on the PYTHONPATH):
+
+    $ python benchmarks/bench_sobol.py
+"""
+from __future__ import division, print_function, absolute_import
+
+import time
+
+import numpy
+
+from shgo.shgo_m.sobol_seq import Sobol
+
+
+def per_seed_generate(dim_num, n, skip=0):
+    """The per-seed loop previously used by Sobol.i4_sobol_generate"""
+    sobol = Sobol()
+    r = numpy.full((n, dim_num), numpy.nan)
+    for j in range(n):
+        r[j, 0:dim_num], next_seed = sobol.i4_sobol(dim_num, j + skip)
+    return r
+
+
+def bulk_generate(dim_num, n, skip=0):
+    return Sobol().i4_sobol_generate(dim_num, n, skip=skip)
+
+
+def points_per_second(generate, dim_num, n, repeat=3):
+    best = numpy.inf
+    for _ in range(repeat):
+        t0 = time.time()
+        generate(dim_num, n)
+        best = min(best, time.time() - t0)
+    return n / max(best, 1e-9)
+
+
+def main():
+    print('{:>6} {:>8} {:>16} {:>16} {:>9}'.format(
+        'dim', 'n', 'per-seed pts/s', 'bulk pts/s', 'speedup'))
+    for dim_num in (2, 10, 39):
+        for n in (1000, 10000, 100000):
+            # Check that both paths still agree before timing them
+            if n <= 10000:
+                numpy.testing.assert_array_equal(
+                    per_seed_generate(dim_num, 256), bulk_generate(dim_num, 256))
+                old = points_per_second(per_seed_generate, dim_num, n, repeat=1)
+            else:  # The per-seed loop is too slow to be worth timing here
+                old = numpy.nan
+            new = points_per_second(bulk_generate, dim_num, n)
+            print('{:>6} {:>8} {:>16.0f} {:>16.0f} {:>9.1f}'.format(
+                dim_num, n, old, new, new / old))
+
+
+if __name__ == '__main__':
+    main()
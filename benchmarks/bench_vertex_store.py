@@ -0,0 +1,76 @@
+"""
+Benchmark of the vertex storage of the simplicial complex used by
+``sampling_method='simplicial'``.
+
+Compares the memory held by the complex and the time taken to build it for
+the struct-of-arrays ``VertexStore`` with the previous object graph of
+``Vertex`` objects in a ``VertexCache``.
+
+Usage (Python 3, with shgo installed or on the PYTHONPATH):
+
+    $ python benchmarks/bench_vertex_store.py
+"""
+from __future__ import division, print_function, absolute_import
+
+import gc
+import time
+import tracemalloc
+
+import numpy
+
+from shgo.shgo_m.triangulation import Complex
+
+
+def sphere(x):
+    return numpy.sum(x ** 2)
+
+
+def build(dim, gens, vertex_store):
+    """Builds a complex of `gens` generations, returns it and the time"""
+    t0 = time.time()
+    HC = Complex(dim, sphere, bounds=[(-1.0, 1.0)] * dim,
+                 vertex_store=vertex_store)
+    for _ in range(gens):
+        HC.split_generation()
+    # Minimiser detection reads the neighbours of every vertex
+    minimisers = sum(1 for x in HC.V.cache if HC.V[x].minimiser())
+    return HC, minimisers, time.time() - t0
+
+
+def memory(dim, gens, vertex_store):
+    """Memory (bytes) held by a built complex"""
+    gc.collect()
+    tracemalloc.start()
+    HC, minimisers, _ = build(dim, gens, vertex_store)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, len(HC.V.cache), minimisers
+
+
+def main():
+    print('{:>4} {:>5} {:>9} {:>12} {:>12} {:>12} {:>12} {:>9} {:>9}'.format(
+        'dim', 'gens', 'vertices', 'objects MB', 'arrays MB',
+        'objects pk', 'arrays pk', 'objects s', 'arrays s'))
+    for dim, gens in ((2, 5), (3, 4), (4, 3), (5, 2), (6, 2), (7, 1)):
+        mem = {}
+        sec = {}
+        for vertex_store in ('objects', 'arrays'):
+            current, peak, n, minimisers = memory(dim, gens, vertex_store)
+            mem[vertex_store] = (current / 2 ** 20, peak / 2 ** 20)
+            sec[vertex_store] = min(build(dim, gens, vertex_store)[2]
+                                    for _ in range(2))
+            # Both stores must build the same complex
+            if vertex_store == 'objects':
+                n_ref, minimisers_ref = n, minimisers
+            else:
+                assert (n, minimisers) == (n_ref, minimisers_ref)
+
+        print('{:>4} {:>5} {:>9} {:>12.2f} {:>12.2f} {:>12.2f} {:>12.2f} '
+              '{:>9.3f} {:>9.3f}'.format(
+                  dim, gens, n, mem['objects'][0], mem['arrays'][0],
+                  mem['objects'][1], mem['arrays'][1], sec['objects'],
+                  sec['arrays']))
+
+
+if __name__ == '__main__':
+    main()
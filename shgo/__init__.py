@@ -1,4 +1,9 @@
 from shgo.shgo_m.triangulation import *
 from ._shgo import shgo
 
+try:
+    from ._ashgo import ashgo  # Python 3.5+ only
+except SyntaxError:
+    pass
+
 __all__ = [s for s in dir() if not s.startswith('_')]
@@ -0,0 +1,112 @@
+"""
+ashgo: shgo for objective functions which are coroutines (Python 3.5+)
+"""
+import asyncio
+import concurrent.futures
+import threading
+
+from ._shgo import SHGO, _solve
+
+__all__ = ['ashgo']
+
+
+async def ashgo(func, bounds, args=(), constraints=None, n=100, iters=1,
+                callback=None, minimizer_kwargs=None, options=None,
+                sampling_method='simplicial', concurrency=8):
+    """
+    Finds the global minimum of an objective function defined as a coroutine
+    function using simplicial homology global optimisation.
+
+    The algorithm runs in a thread of the default executor of the event loop
+    while the evaluations of ``func`` run on the event loop itself. Up to
+    ``concurrency`` evaluations are in flight at the same time, both for the
+    sampling points (or the vertices of every generation of the simplicial
+    complex) and for the local minimisations, which are started from every
+    point of the minimiser pool at the same time unless the ``local_iter``
+    or ``f_min`` options are used. This suits I/O bound objective functions,
+    for example ones that await the result of an external simulation.
+
+    Parameters
+    ----------
+    func : coroutine function
+        The objective function to be minimized, ``await func(x, *args)``
+        must return the function value at ``x``. The constraint functions
+        are ordinary functions.
+    concurrency : int, optional
+        Maximum number of evaluations of ``func`` in flight.
+
+    See `shgo` for the other parameters and the returned `OptimizeResult`.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from shgo import ashgo
+    >>> async def rosen(x):
+    ...     await asyncio.sleep(0.01)  # An external simulation
+    ...     return (1 - x[0])**2 + 100 * (x[1] - x[0]**2)**2
+    >>> loop = asyncio.new_event_loop()
+    >>> res = loop.run_until_complete(ashgo(rosen, [(0, 2), (0, 2)]))
+    >>> loop.close()
+    >>> res.x
+    array([1., 1.])
+    >>> float(res.fun)
+    3.658411273465293e-19
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except AttributeError:  # Python < 3.7
+        loop = asyncio.get_event_loop()
+    func = CoroutineFunction(func, loop)
+    executor = concurrent.futures.ThreadPoolExecutor(concurrency)
+    try:
+        shc = SHGO(func, bounds, args=args, constraints=constraints, n=n,
+                   iters=iters, callback=callback,
+                   minimizer_kwargs=minimizer_kwargs, options=options,
+                   sampling_method=sampling_method, workers=executor)
+        shc.local_workers = executor.map
+        return await loop.run_in_executor(None, _solve, shc)
+    except asyncio.CancelledError:
+        # The threads evaluating func wait for coroutines on this loop, make
+        # them return before the loop stops running them
+        func.cancel()
+        raise
+    finally:
+        # Waiting for the threads would block the loop they wait for
+        executor.shutdown(wait=False)
+
+
+class CoroutineFunction(object):
+    """
+    Blocking call of the coroutine function `func` on the event loop `loop`
+    for use in threads other than the thread of the loop. After `cancel`
+    the pending calls and all new calls raise
+    `concurrent.futures.CancelledError`.
+    """
+
+    def __init__(self, func, loop):
+        self.func = func
+        self.loop = loop
+        self.cancelled = False
+        self.futures = set()  # The pending calls
+        self._lock = threading.Lock()
+
+    def __call__(self, x, *args):
+        with self._lock:
+            if self.cancelled:
+                raise concurrent.futures.CancelledError()
+            future = asyncio.run_coroutine_threadsafe(self.func(x, *args),
+                                                      self.loop)
+            self.futures.add(future)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self.futures.discard(future)
+
+    def cancel(self):
+        """Cancels the pending calls and refuses new ones"""
+        with self._lock:
+            self.cancelled = True
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
@@ -11,14 +11,20 @@ import numpy
 import scipy.optimize
 import scipy.spatial
 
+import shgo.shgo_m.samplers as samplers
 import shgo.shgo_m.sobol_seq as sobol_seq
-from shgo.shgo_m.triangulation import Complex
+from shgo.shgo_m.evaluation_store import EvaluationStore, FunctionCache
+from shgo.shgo_m.parallel import (MapWrapper, SampleEvaluator,
+                                   evaluate_points)
+from shgo.shgo_m.sample_store import SampleStore
+from shgo.shgo_m.triangulation import Complex, LazyComplex
 
 __all__ = ['shgo']
 
 
 def shgo(func, bounds, args=(), constraints=None, n=100, iters=1, callback=None,
-         minimizer_kwargs=None, options=None, sampling_method='simplicial'):
+         minimizer_kwargs=None, options=None, sampling_method='simplicial',
+         workers=1):
     """Finds the global minimum of a function using simplicial homology global
     optimisation.
 
@@ -78,7 +84,9 @@ def shgo(func, bounds, args=(), constraints=None, n=100, iters=1, callback=None,
     n : int, optional
         Number of sampling points used in the construction of the simplicial
         complex. Note that this argument is only used for ``sobol`` and other
-        arbitrary sampling_methods.
+        arbitrary sampling_methods, and by the ``lazy_complex`` option (see
+        ``options``) as the number of new starting points of its descents
+        per iteration.
 
     iters : int, optional
         Number of iterations used in the construction of the simplicial complex.
@@ -182,6 +190,87 @@ def shgo(func, bounds, args=(), constraints=None, n=100, iters=1, callback=None,
             respect to function evaluations before the global minimum is found,
             specifying False will use less memory at the cost of a slight
             decrease in performance. Defaults to True.
+        * seed : int
+            Seed of the random number generator of randomised sampling
+            methods (``lhs``).
+        * vectorized : bool
+            If True then the objective function and the constraint functions
+            are called once with all the new sampling points of an iteration
+            in an array ``x`` of shape ``(dim, N)`` (the same convention used
+            for the constraints when ``infty_constraints`` is False) and must
+            return an array of shape ``(N,)``. Functions indexing ``x[i]``
+            along the first axis, such as ``x[0]**2 + x[1]**2``, support this
+            without changes. The local minimisation routine still calls the
+            objective function with single points of shape ``(dim,)``.
+            Defaults to False.
+        * parallel_split : bool
+            If True then the cells of every generation of the ``simplicial``
+            complex are split in chunks mapped over the ``workers``, which
+            compute the coordinates of the new vertices, while the vertices
+            shared by cells are merged in the main process. Useful in higher
+            dimensions (5 to 8) where the subdivision itself is costly. The
+            complex is the same as without the option. Ignored with the
+            ``symmetry`` option. Defaults to False.
+        * refinement : str
+            Cells of the ``simplicial`` complex split by every iteration,
+            ``'uniform'`` splits every cell, ``'minimisers'`` only the cells
+            with a vertex within ``refinement_neighbourhood`` edges of a
+            minimiser candidate, which refines the basins of the minima
+            further for the same number of function evaluations. The other
+            cells are kept for later iterations and the stopping criteria
+            are unchanged. Defaults to ``'uniform'``.
+        * refinement_neighbourhood : int
+            Number of edges around the minimiser candidates within which the
+            cells are split by the ``'minimisers'`` refinement. Defaults to
+            1.
+        * lazy_complex : bool
+            If True then the ``simplicial`` complex is a Freudenthal
+            triangulation of the domain whose vertices are only generated
+            and evaluated where the minimiser search visits them (see
+            ``shgo.shgo_m.triangulation.LazyComplex``): it descends from the
+            centre of the domain and from ``n`` points of a Sobol sequence
+            moved to the grid, and every iteration halves the grid spacing
+            and descends again from the minimisers found, from the starting
+            points of the previous iteration and from ``n`` new points.
+            Intended for higher dimensions (10 and more) in which the
+            ``2**dim`` vertices of every hypercube cell are too many, it only
+            generates the vertices visited by the descents. The
+            ``symmetry``, ``refinement`` and ``parallel_split`` options are
+            ignored. Defaults to False.
+        * star_depth : int
+            With ``lazy_complex``, a minimiser is only compared with the
+            neighbours differing from it in at most ``star_depth``
+            coordinates (``2 * dim`` neighbours for 1 and ``dim * (dim + 1)``
+            for 2 instead of all ``2**(dim + 1) - 2``), which is required in
+            high dimensions at the cost of the guarantee that a minimiser is
+            lower than all its neighbours in the triangulation. None compares
+            all the neighbours. Defaults to 2.
+        * template_dir : str
+            Directory in which the triangulations of the initial hypercube
+            of the ``simplicial`` complex are stored (one file per
+            dimension), so that later runs in the same dimension load them
+            instead of constructing them again.
+        * sample_dir : str
+            Scratch directory in which the sampling points and their
+            objective function values of the ``sobol`` type sampling methods
+            are stored in memory-mapped files instead of in memory, to run
+            very large numbers of sampling points. The files are removed
+            when shgo returns. Note that the Delaunay triangulation of the
+            points is still held in memory.
+        * eval_store : str or EvaluationStore
+            Path of an SQLite database (or a
+            ``shgo.shgo_m.evaluation_store.EvaluationStore``) in which every
+            objective function value is stored, keyed by the exact
+            coordinates of the point. Values found in the store are reused
+            by the sampling, the simplicial complex and the local
+            minimisation instead of evaluating ``func`` again, so a rerun
+            with different ``options`` or ``minimizer_kwargs`` only
+            evaluates new points. Cannot be used with ``jac=True`` in
+            ``minimizer_kwargs`` (raises a ValueError).
+        * fingerprint : str
+            Identifies the objective function (and ``args``) in the
+            ``eval_store``, it must be changed whenever the objective
+            function changes. Defaults to ``''``.
 
         Feedback:
 
@@ -189,18 +278,45 @@ def shgo(func, bounds, args=(), constraints=None, n=100, iters=1, callback=None,
             Set to True to print convergence messages.
 
 
-    sampling_method : str or function, optional
-        Current built in sampling method options are ``sobol`` and
-        ``simplicial``. The default ``simplicial`` uses less memory and provides
-        the theoretical guarantee of convergence to the global minimum in finite
-        time. The ``sobol`` method is faster in terms of sampling point
-        generation at the cost of higher memory resources and the loss of
-        guaranteed convergence. It is more appropriate for most "easier"
-        problems where the convergence is relatively fast.
+    sampling_method : str, function or sampler object, optional
+        Current built in sampling method options are ``sobol``, ``halton``,
+        ``lattice``, ``lhs`` and ``simplicial``. The default ``simplicial``
+        uses less memory and provides the theoretical guarantee of convergence
+        to the global minimum in finite time. The ``sobol`` method is faster
+        in terms of sampling point generation at the cost of higher memory
+        resources and the loss of guaranteed convergence. It is more
+        appropriate for most "easier" problems where the convergence is
+        relatively fast. The ``halton`` (Halton sequence), ``lattice``
+        (extensible rank-1 lattice) and ``lhs`` (Latin hypercube) methods are
+        used in the same way as ``sobol``; on smooth objective functions a
+        lattice often finds the same minimiser pool with fewer sampling
+        points.
         User defined sampling functions must accept two arguments of ``n``
         sampling points of dimension ``dim`` per call and output an array of s
-        ampling points with shape `n x dim`. See SHGO.sampling_sobol for an
-        example function.
+        ampling points with shape `n x dim`. See SHGO.sampling_custom.
+        Alternatively a sampler object with a ``next_batch(n)`` method can be
+        specified, every iteration it is asked for only the ``n`` new points
+        in the unit hypercube which shgo scales to the bounds (see
+        ``shgo.shgo_m.samplers.Sampler`` for the protocol, including optional
+        state save and restore). For example a
+        ``shgo.shgo_m.sobol_seq.SobolStream`` samples from a scrambled Sobol
+        sequence with a chosen seed, or from one of the non-overlapping
+        substreams of a sequence (to split one sampling budget over several
+        worker processes), and ``shgo.shgo_m.samplers.ArraySampler`` from a
+        precomputed design, which may be a ``numpy.memmap`` on disk.
+
+    workers : int or map-like callable, optional
+        Evaluate the constraints and the objective function at the sampling
+        points of the ``sobol`` type sampling methods, or at the new vertices
+        of every generation of the ``simplicial`` complex, in parallel. If an
+        int, the points are divided among a ``multiprocessing.Pool`` of
+        ``workers`` processes (``-1`` uses all available CPU cores); ``func``
+        and the constraints must then be picklable. Alternatively supply an
+        object with a ``map`` method, such as a ``multiprocessing.Pool`` or a
+        ``concurrent.futures.Executor``, or a map-like callable
+        ``workers(func, iterable)``. The local minimisation routine is not
+        parallelised. Ignored if the ``vectorized`` option is used.
+        Defaults to 1 (serial evaluation).
 
 
     Returns
@@ -216,9 +332,14 @@ def shgo(func, bounds, args=(), constraints=None, n=100, iters=1, callback=None,
         successfully,
         ``message`` which describes the cause of the termination,
         ``nfev`` the total number of objective function evaluations including
-        the sampling calls,
-        ``nlfev`` the total number of objective function evaluations
-        culminating from all local search optimisations,
+        the sampling calls (every point is evaluated once, see
+        ``cache_hits``),
+        ``nlfev`` the total number of objective function calls culminating
+        from all local search optimisations, including the calls answered by
+        the cache,
+        ``cache_hits`` and ``cache_misses`` the number of function values
+        reused from the cache of the run (or from the ``eval_store``) and
+        evaluated respectively,
         ``nit`` number of iterations performed by the global routine.
 
     Notes
@@ -390,20 +511,22 @@ def shgo(func, bounds, args=(), constraints=None, n=100, iters=1, callback=None,
     >>> bounds = [(0, 1.0),]*4
     >>> res = shgo(f, bounds, iters=3, constraints=cons)
     >>> res
-         fun: 29.894378159142136
-        funl: array([29.89437816])
-     message: 'Optimization terminated successfully.'
-        nfev: 119
-         nit: 3
-       nlfev: 40
-       nlhev: 0
-       nljev: 5
-     success: True
-           x: array([6.35521569e-01, 1.13700270e-13, 3.12701881e-01, 5.17765506e-02])
-          xl: array([[6.35521569e-01, 1.13700270e-13, 3.12701881e-01, 5.17765506e-02]])
+      cache_hits: 1
+    cache_misses: 113
+             fun: 29.89437815914247
+            funl: array([29.89437816])
+         message: 'Optimization terminated successfully.'
+            nfev: 113
+             nit: 3
+           nlfev: 35
+           nlhev: 0
+           nljev: 5
+         success: True
+               x: array([6.35521569e-01, 4.96298914e-14, 3.12701881e-01, 5.17765506e-02])
+              xl: array([[6.35521569e-01, 4.96298914e-14, 3.12701881e-01, 5.17765506e-02]])
 
     >>> g1(res.x), g2(res.x), h1(res.x)
-    (-5.0626169922907138e-14, -2.9594104944408173e-12, 0.0)
+    (-3.8813396940895473e-13, -1.638245095136881e-12, 0.0)
 
 
     References
@@ -430,44 +553,62 @@ def shgo(func, bounds, args=(), constraints=None, n=100, iters=1, callback=None,
     shc = SHGO(func, bounds, args=args, constraints=constraints, n=n,
                iters=iters, callback=callback,
                minimizer_kwargs=minimizer_kwargs,
-               options=options, sampling_method=sampling_method)
-
-    # Run the algorithm, process results and test success
-    shc.construct_complex()
-
-    if not shc.break_routine:
-        if shc.disp:
-            print("Successfully completed construction of complex.")
+               options=options, sampling_method=sampling_method,
+               workers=workers)
 
-    # Test post iterations success
-    if len(shc.LMC.xl_maps) == 0:
-        # If sampling failed to find pool, return lowest sampled point
-        # with a warning
-        shc.find_lowest_vertex()
-        shc.break_routine = True
-        shc.fail_routine(mes="Failed to find a feasible minimiser point. "
-                             "Lowest sampling point = {}".format(shc.f_lowest))
-        shc.res.fun = shc.f_lowest
-        shc.res.x = shc.x_lowest
-        shc.res.nfev = shc.fn
+    return _solve(shc)
 
-    # Confirm the routine ran successfully
-    if not shc.break_routine:
-        shc.res.message = 'Optimization terminated successfully.'
-        shc.res.success = True
 
-    # Return the final results
-    return shc.res
+def _solve(shc):
+    """
+    Run the algorithm of an initiated SHGO class and return the results
+    """
+    try:
+        # Run the algorithm, process results and test success
+        with shc.workers:  # Closes a process pool created for the workers
+            shc.construct_complex()
+
+        if not shc.break_routine:
+            if shc.disp:
+                print("Successfully completed construction of complex.")
+
+        # Test post iterations success
+        if len(shc.LMC.xl_maps) == 0:
+            # If sampling failed to find pool, return lowest sampled point
+            # with a warning
+            shc.find_lowest_vertex()
+            shc.break_routine = True
+            shc.fail_routine(mes="Failed to find a feasible minimiser point. "
+                                 "Lowest sampling point = {}".format(shc.f_lowest))
+            shc.res.fun = shc.f_lowest
+            shc.res.x = shc.x_lowest
+            shc.count_evaluations()
+
+        # Confirm the routine ran successfully
+        if not shc.break_routine:
+            shc.res.message = 'Optimization terminated successfully.'
+            shc.res.success = True
+
+        # Return the final results
+        return shc.res
+    finally:
+        # Remove the files of a memory-mapped sample store
+        if shc.samples is not None:
+            shc.samples.close()
+        # Close the connections to the database of the evaluations
+        if shc.eval_store is not None:
+            shc.eval_store.close()
 
 
 class SHGO(object):
     def __init__(self, func, bounds, args=(), constraints=None, n=None,
                  iters=None, callback=None, minimizer_kwargs=None,
-                 options=None, sampling_method='sobol'):
+                 options=None, sampling_method='sobol', workers=1):
 
         # Input checks
-        methods = ['sobol', 'simplicial']
-        if sampling_method not in methods:
+        methods = ['sobol', 'simplicial', 'halton', 'lattice', 'lhs']
+        if not (sampling_method in methods or callable(sampling_method) or
+                hasattr(sampling_method, 'next_batch')):
             raise ValueError(("Unknown sampling_method specified."
                               " Valid methods: {}").format(', '.join(methods)))
 
@@ -564,6 +705,16 @@ class SHGO(object):
             # Algorithm functionality
             self.local_iter = False
             self.infty_cons_sampl = True
+            self.seed = None
+            self.vectorized = False
+            self.parallel_split = False
+            self.refinement = 'uniform'
+            self.refinement_neighbourhood = 1
+            self.template_dir = None
+            self.lazy_complex = False
+            self.star_depth = 2
+            self.eval_store = None
+            self.sample_dir = None
 
             # Feedback
             self.disp = False
@@ -630,27 +781,58 @@ class SHGO(object):
 
         # Set complex construction mode based on a provided stopping criteria:
         # Choose complex constructor
+        self.sampler = None  # Sampling point stream of the Delaunay complex
+        self.samples = None  # Sampling point storage of the Delaunay complex
         if sampling_method == 'simplicial':
             self.iterate_complex = self.iterate_hypercube
             self.minimizers = self.simplex_minimizers
             self.sampling_method = sampling_method
 
-        elif (sampling_method == 'sobol') or (type(sampling_method) is not str):
+        else:
             self.iterate_complex = self.iterate_delauney
             self.minimizers = self.delaunay_complex_minimisers
             # Sampling method used
             if sampling_method == 'sobol':
                 self.sampling_method = sampling_method
-                self.sampling = self.sampling_sobol
+                self.sampling = self.sampling_stream
                 self.Sobol = sobol_seq.Sobol()  # Init Sobol class
                 if self.dim < 40:
                     self.sobol_points = self.sobol_points_40
                 else:
                     self.sobol_points = self.sobol_points_10k
+                # Resumable stream, every iteration only draws new points
+                self.sampler = sobol_seq.SobolStream(self.dim)
+            elif hasattr(sampling_method, 'next_batch'):
+                # A user supplied sampler object, for example a (scrambled or
+                # sub-) stream of Sobol points (see samplers.Sampler)
+                if getattr(sampling_method, 'dim', self.dim) != self.dim:
+                    raise ValueError('The dimension of the sampler does not '
+                                     'match the bounds.')
+                self.sampling_method = sampling_method
+                self.sampling = self.sampling_stream
+                self.sampler = sampling_method
+            elif sampling_method == 'halton':
+                self.sampling_method = sampling_method
+                self.sampling = self.sampling_stream
+                self.sampler = samplers.Halton(self.dim)
+            elif sampling_method == 'lattice':
+                self.sampling_method = sampling_method
+                self.sampling = self.sampling_stream
+                self.sampler = samplers.Lattice(self.dim)
+            elif sampling_method == 'lhs':
+                self.sampling_method = sampling_method
+                self.sampling = self.sampling_stream
+                self.sampler = samplers.LatinHypercube(self.dim,
+                                                       seed=self.seed)
             else:
-                # A user defined sampling method:
-                # self.sampling_points = sampling_method
-                self.sampling = sampling_method
+                # A user defined sampling function
+                self.sampling_method = sampling_method
+                self.sampling = self.sampling_custom
+                self.sampling_function = sampling_method
+
+            # Sampling points and their function values, self.C and self.F
+            # are views of the store
+            self.samples = SampleStore(self.dim, directory=self.sample_dir)
 
         # Local controls
         self.stop_l_iter = False  # Local minimisation iterations
@@ -669,6 +851,20 @@ class SHGO(object):
         self.res.nljev = 0  # Local Jacobian evals for all minimisers
         self.res.nlhev = 0  # Local Hessian evals for all minimisers
 
+        # Cache of the objective function values, shared by the sampling and
+        # the local minimisation (and by previous runs with an eval_store)
+        self.func = FunctionCache(self.func, store=self.eval_store)
+
+        # Parallel evaluation of the sampling points (the process pool is
+        # created by the first evaluation, close it with
+        # self.workers.close() when SHGO is used directly)
+        self.workers = MapWrapper(workers)
+        self.sample_evaluator = SampleEvaluator(self.func, self.args,
+                                                self.g_cons, self.g_args)
+        # Map-like callable running local minimisations at the same time
+        # (see SHGO.minimize_concurrent)
+        self.local_workers = None
+
     # Initiation aids
     def init_options(self, options):
         """
@@ -715,6 +911,41 @@ class SHGO(object):
 
         self.infty_cons_sampl = options.get('infty_constraints', True)
 
+        # Seed of randomised sampling methods
+        self.seed = options.get('seed', None)
+
+        # Evaluate batches of sampling points with one function call
+        self.vectorized = options.get('vectorized', False)
+
+        # Split the cells of the simplicial complex with the workers
+        self.parallel_split = options.get('parallel_split', False)
+
+        # Cells of the simplicial complex split by every iteration
+        self.refinement = options.get('refinement', 'uniform')
+        self.refinement_neighbourhood = options.get(
+            'refinement_neighbourhood', 1)
+
+        # Directory of the triangulations of the initial hypercube
+        self.template_dir = options.get('template_dir', None)
+
+        # Lazily generated simplicial complex
+        self.lazy_complex = options.get('lazy_complex', False)
+        self.star_depth = options.get('star_depth', 2)
+
+        # Scratch directory of memory-mapped sampling point arrays
+        self.sample_dir = options.get('sample_dir', None)
+
+        # Persistent storage of the objective function evaluations
+        self.eval_store = options.get('eval_store', None)
+        if (self.eval_store is not None and
+                self.minimizer_kwargs.get('jac') is True):
+            raise ValueError("eval_store can not be used with jac=True in "
+                             "minimizer_kwargs")
+        if not (self.eval_store is None or
+                isinstance(self.eval_store, EvaluationStore)):
+            self.eval_store = EvaluationStore(self.eval_store,
+                                              options.get('fingerprint', ''))
+
         # Feedback
         self.disp = options.get('disp', False)
 
@@ -747,6 +978,10 @@ class SHGO(object):
 
         self.res.nit = self.iters_done + 1
 
+        # Position of the sampler, can be used to resume the sequence
+        if hasattr(self.sampler, 'get_state'):
+            self.res.sampler_state = self.sampler.get_state()
+
     def find_minima(self):
         """Construct the minimiser pool, map the minimisers to local minima
            and sort the results into a global return object"""
@@ -782,9 +1017,9 @@ class SHGO(object):
                 self.f_lowest = None
                 self.x_lowest = None
             else:
-                self.f_I = numpy.argsort(self.F, axis=-1)
-                self.f_lowest = self.F[self.f_I[0]]
-                self.x_lowest = self.C[self.f_I[0]]
+                i_lowest = numpy.argmin(self.F)
+                self.f_lowest = self.F[i_lowest]
+                self.x_lowest = numpy.array(self.C[i_lowest])
 
     # Stopping criteria functions:
     def finite_iterations(self):
@@ -893,11 +1128,27 @@ class SHGO(object):
         NOTE: Called with self.iterate_complex() after class initiation
         """
         # Iterate the complex
-        if self.n_sampled == 0:
+        if self.n_sampled == 0 and self.lazy_complex:
+            # Triangulation generated by the minimiser search
+            self.HC = LazyComplex(self.dim, self.func, self.args,
+                                  self.bounds, self.g_cons, self.g_args,
+                                  vectorized=self.vectorized,
+                                  workers=self.workers,
+                                  star_depth=self.star_depth,
+                                  n_seeds=self.n)
+        elif self.n_sampled == 0:
             # Initial triangulation of the hyper-rectangle
             self.HC = Complex(self.dim, self.func, self.args,
                               self.symmetry, self.bounds, self.g_cons,
-                              self.g_args)
+                              self.g_args, vectorized=self.vectorized,
+                              workers=self.workers,
+                              split_workers=(self.workers
+                                             if self.parallel_split
+                                             else None),
+                              refinement=self.refinement,
+                              refinement_neighbourhood=(
+                                  self.refinement_neighbourhood),
+                              template_dir=self.template_dir)
         else:
             self.HC.split_generation()
 
@@ -923,36 +1174,35 @@ class SHGO(object):
         Returns the indexes of all minimizers
         """
         self.minimizer_pool = []
-        # Note: Can implement parallelization here
-        for x in self.HC.V.cache:
-            if self.HC.V[x].minimiser():
-                if self.disp:
-                    logging.info('=' * 60)
-                    logging.info(
-                        'v.x = {} is minimiser'.format(self.HC.V[x].x_a))
-                    logging.info('v.f = {} is minimiser'.format(self.HC.V[x].f))
-                    logging.info('=' * 30)
+        # Found for whole generations of cells or maintained by the vertex
+        # cache (only the vertices changed since the last iteration are
+        # checked)
+        for v in self.HC.minimisers():
+            if self.disp:
+                logging.info('=' * 60)
+                logging.info('v.x = {} is minimiser'.format(v.x_a))
+                logging.info('v.f = {} is minimiser'.format(v.f))
+                logging.info('=' * 30)
 
-                if self.HC.V[x] not in self.minimizer_pool:
-                    self.minimizer_pool.append(self.HC.V[x])
+            self.minimizer_pool.append(v)
 
-                if self.disp:
-                    logging.info('Neighbours:')
-                    logging.info('=' * 30)
-                    for vn in self.HC.V[x].nn:
-                        logging.info('x = {} || f = {}'.format(vn.x, vn.f))
+            if self.disp:
+                logging.info('Neighbours:')
+                logging.info('=' * 30)
+                for vn in v.nn:
+                    logging.info('x = {} || f = {}'.format(vn.x, vn.f))
 
-                    logging.info('=' * 60)
+                logging.info('=' * 60)
 
         self.minimizer_pool_F = []
         self.X_min = []
-        # normalized tuple in the Vertex cache
+        # Lattice point key in the Vertex cache
         self.X_min_cache = {}  # Cache used in hypercube sampling
 
         for v in self.minimizer_pool:
             self.X_min.append(v.x_a)
             self.minimizer_pool_F.append(v.f)
-            self.X_min_cache[tuple(v.x_a)] = v.x
+            self.X_min_cache[tuple(v.x_a)] = v.key
 
         self.minimizer_pool_F = numpy.array(self.minimizer_pool_F)
         self.X_min = numpy.array(self.X_min)
@@ -978,6 +1228,11 @@ class SHGO(object):
 
         """
 
+        # Every starting point is minimised if no stopping criteria is set
+        if (self.local_workers is not None and not force_iter
+                and not self.local_iter and self.f_min_true is None):
+            self.minimize_concurrent()
+
         # Find first local minimum
         # NOTE: Since we always minimize this value regardless it is a waste to
         # build the topograph first before minimizing
@@ -1140,28 +1395,59 @@ class SHGO(object):
             print('Starting '
                   'minimization at {}...'.format(x_min))
 
-        if self.sampling_method == 'simplicial':
-            x_min_t = tuple(x_min)
-            # Find the normalized tuple in the Vertex cache:
-            x_min_t_norm = self.X_min_cache[tuple(x_min_t)]
+        g_bounds = self.local_bounds(x_min, ind=ind)
+        if 'bounds' in self.min_solver_args:
+            self.minimizer_kwargs['bounds'] = g_bounds
 
-            x_min_t_norm = tuple(x_min_t_norm)
+        if self.disp and self.sampling_method == 'simplicial':
+            print('bounds in kwarg:')
+            print(self.minimizer_kwargs['bounds'])
 
-            g_bounds = self.contstruct_lcb_simplicial(self.HC.V[x_min_t_norm])
-            if 'bounds' in self.min_solver_args:
-                self.minimizer_kwargs['bounds'] = g_bounds
+        lres = scipy.optimize.minimize(self.func, x_min,
+                                       **self.minimizer_kwargs)
 
-            if self.disp:
-                print('bounds in kwarg:')
-                print(self.minimizer_kwargs['bounds'])
+        return self.add_local_res(x_min, lres, g_bounds)
+
+    def local_bounds(self, x_min, ind=None):
+        """
+        Returns the bounds of the local minimisation starting at `x_min`
+        """
+        if self.sampling_method == 'simplicial':
+            # Find the lattice point key in the Vertex cache:
+            x_min_key = self.X_min_cache[tuple(x_min)]
+
+            return self.contstruct_lcb_simplicial(self.HC.V[x_min_key])
         else:
-            g_bounds = self.contstruct_lcb_delauney(x_min, ind=ind)
+            return self.contstruct_lcb_delauney(x_min, ind=ind)
+
+    def minimize_concurrent(self):
+        """
+        Run the local minimisations of all starting points in the minimiser
+        pool at the same time with ``self.local_workers``, a map-like callable
+        (for example the ``map`` method of a thread pool). The results are
+        stored in the local minima cache where `minimize` finds them.
+        """
+        jobs = []
+        for x_min, ind in zip(self.X_min, self.minimizer_pool):
+            if self.LMC[x_min].lres is not None:
+                continue
+            g_bounds = self.local_bounds(x_min, ind=ind)
+            minimizer_kwargs = dict(self.minimizer_kwargs)
             if 'bounds' in self.min_solver_args:
-                self.minimizer_kwargs['bounds'] = g_bounds
+                minimizer_kwargs['bounds'] = g_bounds
+            jobs.append((x_min, g_bounds, minimizer_kwargs))
 
-        lres = scipy.optimize.minimize(self.func, x_min,
-                                       **self.minimizer_kwargs)
+        def local_minimize(job):
+            return scipy.optimize.minimize(self.func, job[0], **job[2])
 
+        for job, lres in zip(jobs, self.local_workers(local_minimize, jobs)):
+            self.add_local_res(job[0], lres, job[1])
+
+    def add_local_res(self, x_min, lres, g_bounds):
+        """
+        Count the evaluations of the local minimisation result `lres`
+        starting at `x_min` and add it to the local minima cache
+        """
         if self.disp:
             print('lres = {}'.format(lres))
 
@@ -1195,11 +1481,19 @@ class SHGO(object):
         self.res.x = results['x']
         self.res.fun = results['fun']
 
-        # Add local func evals to sampling func evals
-        # Count the number of feasible vertices and add to local func evals:
-        self.res.nfev = self.fn + self.res.nlfev
+        self.count_evaluations()
         return self.res
 
+    def count_evaluations(self):
+        """
+        Report the objective function evaluations in the result, points
+        evaluated by both the sampling and the local minimisation (or by
+        several local minimisations) are only counted once
+        """
+        self.res.nfev = self.func.misses
+        self.res.cache_hits = self.func.hits
+        self.res.cache_misses = self.func.misses
+
     # Algorithm controls
     def fail_routine(self, mes="Failed to converge"):
         self.break_routine = True
@@ -1231,8 +1525,9 @@ class SHGO(object):
             if self.g_cons is not None:
                 self.sampling_subspace()
 
-        # Sort remaining samples
-        self.sorted_samples()
+        # Sort remaining samples (only used by scalar objective functions)
+        if self.dim < 2:
+            self.sorted_samples()
 
         # Find objective function references
         self.fun_ref()
@@ -1285,99 +1580,72 @@ class SHGO(object):
         """
         Wrapper for sobol_seq.i4_sobol_generate
 
-        Generate N sampling points in D dimensions
+        Generate N sampling points in D dimensions starting at index `skip`
         """
-        points = self.Sobol.i4_sobol_generate(d, n, skip=0)
+        points = self.Sobol.i4_sobol_generate(d, n, skip=skip)
 
         return points
 
-    def sobol_points_10k(self, N, D):
+    def sobol_points_10k(self, N, D, skip=0):
         """
-        sobol.cc by Frances Kuo and Stephen Joe translated to Python 3 by
-        Carl Sandrock 2016-03-31
+        Wrapper for sobol_seq.i4_sobol_generate_10k
 
-        The original program is available and described at
-        http://web.maths.unsw.edu.au/~fkuo/sobol/
+        Generate N sampling points in D dimensions starting at index `skip`
+        using the direction numbers of Joe and Kuo (2008) (sobol.cc by
+        Frances Kuo and Stephen Joe translated to Python 3 by Carl Sandrock
+        2016-03-31)
         """
-        import gzip
-        import os
-        path = os.path.join(os.path.dirname(__file__), 'shgo_m', 'sobol_vec.gz')
-        f = gzip.open(path, 'rb')
-        unsigned = "uint64"
-        # swallow header
-        next(f)
-
-        L = int(numpy.log(N) // numpy.log(2.0)) + 1
-
-        C = numpy.ones(N, dtype=unsigned)
-        for i in range(1, N):
-            value = i
-            while value & 1:
-                value >>= 1
-                C[i] += 1
-
-        points = numpy.zeros((N, D), dtype='double')
-
-        # XXX: This appears not to set the first element of V
-        V = numpy.empty(L + 1, dtype=unsigned)
-        for i in range(1, L + 1):
-            V[i] = 1 << (32 - i)
-
-        X = numpy.empty(N, dtype=unsigned)
-        X[0] = 0
-        for i in range(1, N):
-            X[i] = X[i - 1] ^ V[C[i - 1]]
-            points[i, 0] = X[i] / 2 ** 32
-
-        for j in range(1, D):
-            F_int = [int(item) for item in next(f).strip().split()]
-            (d, s, a), m = F_int[:3], [0] + F_int[3:]
-
-            if L <= s:
-                for i in range(1, L + 1):
-                    V[i] = m[i] << (32 - i)
-            else:
-                for i in range(1, s + 1):
-                    V[i] = m[i] << (32 - i)
-                for i in range(s + 1, L + 1):
-                    V[i] = V[i - s] ^ (
-                        V[i - s] >> numpy.array(s, dtype=unsigned))
-                    for k in range(1, s):
-                        V[i] ^= numpy.array(
-                            (((a >> (s - 1 - k)) & 1) * V[i - k]),
-                            dtype=unsigned)
-
-            X[0] = 0
-            for i in range(1, N):
-                X[i] = X[i - 1] ^ V[C[i - 1]]
-                points[i, j] = X[i] / 2 ** 32  # *** the actual points
-
-        f.close()
+        points = sobol_seq.i4_sobol_generate_10k(D, N, skip=skip)
+
         return points
 
-    def sampling_sobol(self, n, dim):
+    def sampling_stream(self, n, dim):
         """
         Generates uniform sampling points in a hypercube and scales the points
         to the bound limits.
+
+        Only the ``n - self.n_sampled`` points that have not yet been drawn
+        from the sampling stream ``self.sampler`` (Sobol, Halton, lattice or
+        Latin hypercube) are generated, these are appended to ``self.C``.
         """
         # Generate sampling points.
         # Generate uniform sample points in [0, 1]^m \subset R^m
-        if self.n_sampled == 0:
-            self.C = self.sobol_points(n, dim)
-        else:
-            self.C = self.sobol_points(n, dim, skip=self.n_sampled)
+        C_new = numpy.array(self.sampler.next_batch(n - self.n_sampled),
+                            dtype=float)
+        if C_new.shape != (n - self.n_sampled, dim):
+            raise ValueError('The sampler returned an array of shape {}, '
+                             'expected {}.'.format(C_new.shape,
+                                                   (n - self.n_sampled, dim)))
         # Distribute over bounds
         for i in range(len(self.bounds)):
-            self.C[:, i] = (self.C[:, i] *
-                            (self.bounds[i][1] - self.bounds[i][0])
-                            + self.bounds[i][0])
+            C_new[:, i] = (C_new[:, i] *
+                           (self.bounds[i][1] - self.bounds[i][0])
+                           + self.bounds[i][0])
+
+        self.samples.append(C_new)
+        self.C = self.samples.C
+        return self.C
+
+    sampling_sobol = sampling_stream
+
+    def sampling_custom(self, n, dim):
+        """
+        Generates sampling points with a user defined function of the form
+        ``sampling_function(n, dim)`` that returns all ``n`` sampling points
+        of the current iteration (the points of earlier iterations first)
+        already scaled to the bounds.
+        """
+        C = numpy.array(self.sampling_function(n, dim), dtype=float)
+        self.samples.append(C[self.n_sampled:])
+        self.C = self.samples.C
         return self.C
 
     def sampling_subspace(self):
         """Find subspace of feasible points from g_func definition"""
         # Subspace of feasible points.
         for ind, g in enumerate(self.g_cons):
-            self.C = self.C[g(self.C.T, *self.g_args[ind]) >= 0.0]
+            self.samples.compress(g(self.C.T, *self.g_args[ind]) >= 0.0)
+            self.C = self.samples.C
             if self.C.size == 0:
                 self.res.message = ('No sampling point found within the '
                                     + 'feasible set. Increasing sampling '
@@ -1407,38 +1675,70 @@ class SHGO(object):
     def fun_ref(self):
         """
         Find the objective function output reference table
-        TODO: Replace with cached wrapper
         """
-        # Note: This process can be pooled easily
-        # Obj. function returns to be used as reference table.:
-        f_cache_bool = False
-        if self.fn > 0:  # Store old function evaluations
-            Ftemp = self.F
-            fn_old = self.fn
-            f_cache_bool = True
-
-        self.F = numpy.zeros(numpy.shape(self.C)[0])
-        # NOTE: It might be easier to replace this with a cached
-        #      objective function
-        for i in range(self.fn, numpy.shape(self.C)[0]):
-            eval_f = True
-            if self.g_cons is not None:
-                for g in self.g_cons:
-                    if g(self.C[i, :], *self.args) < 0.0:
-                        eval_f = False
-                        break  # Breaks the g loop
+        # Obj. function returns to be used as reference table, the values of
+        # the new sampling points are evaluated in place
+        self.F = self.samples.F
+        if self.vectorized:
+            self.fun_ref_vectorized()
+        elif not self.workers.serial:
+            self.fun_ref_parallel()
+        else:
+            # NOTE: It might be easier to replace this with a cached
+            #      objective function
+            for i in range(self.fn, numpy.shape(self.C)[0]):
+                eval_f = True
+                if self.g_cons is not None:
+                    for g, args in zip(self.g_cons, self.g_args):
+                        if g(self.C[i, :], *args) < 0.0:
+                            eval_f = False
+                            break  # Breaks the g loop
+
+                if eval_f:
+                    self.F[i] = self.func(self.C[i, :], *self.args)
+                    self.fn += 1
+                elif self.infty_cons_sampl:
+                    self.F[i] = numpy.inf
+                    self.fn += 1
+
+        return self.F
 
-            if eval_f:
-                self.F[i] = self.func(self.C[i, :], *self.args)
+    def fun_ref_vectorized(self):
+        """
+        Evaluate the constraints and the objective function of all new
+        sampling points ``self.C[self.fn:]`` with one call per function
+        (see the ``vectorized`` option)
+        """
+        C = self.C[self.fn:]
+        feasible = numpy.ones(C.shape[0], dtype=bool)
+        if self.g_cons is not None:
+            for g, args in zip(self.g_cons, self.g_args):
+                feasible &= numpy.asarray(g(C.T, *args)) >= 0.0
+
+        ind = numpy.arange(self.fn, self.C.shape[0])
+        if numpy.any(feasible):
+            self.F[ind[feasible]] = self.func(C[feasible].T, *self.args)
+        self.fn += numpy.count_nonzero(feasible)
+        if self.infty_cons_sampl:
+            self.F[ind[~feasible]] = numpy.inf
+            self.fn += numpy.count_nonzero(~feasible)
+
+    def fun_ref_parallel(self):
+        """
+        Evaluate the constraints and the objective function of all new
+        sampling points ``self.C[self.fn:]`` in parallel with the workers,
+        the results are stored in the order of the sampling points
+        """
+        ind = range(self.fn, self.C.shape[0])
+        F_new = evaluate_points(self.workers, self.sample_evaluator,
+                                [self.C[i, :] for i in ind])
+        for i, f in zip(ind, F_new):
+            if f is not None:
+                self.F[i] = f
                 self.fn += 1
             elif self.infty_cons_sampl:
                 self.F[i] = numpy.inf
                 self.fn += 1
-        if f_cache_bool:
-            if fn_old > 0:  # Restore saved function evaluations
-                self.F[0:fn_old] = Ftemp
-
-        return self.F
 
     def surface_topo_ref(self):  # Validated
         """
@@ -1449,7 +1749,7 @@ class SHGO(object):
         # nan --> float
         self.F[numpy.isnan(self.F)] = numpy.inf
         # inf, -inf  --> floats
-        self.F = numpy.nan_to_num(self.F)
+        self.F[:] = numpy.nan_to_num(self.F)
 
         self.Ft = self.F[self.Ind_sorted]
         self.Ftp = numpy.diff(self.Ft, axis=0)  # FD
@@ -1559,10 +1859,21 @@ class SHGO(object):
             logging.info('self.nc = {}'.format(self.nc))
             logging.info('numpy.shape(self.C)'
                          ' = {}'.format(numpy.shape(self.C)))
-        for ind in range(self.fn):
-            min_bool = self.sample_delaunay_topo(ind)
-            if min_bool:
-                self.minimizer_pool.append(ind)
+        # A sampling point is a minimiser if its function value is lower than
+        # the values of all its neighbours (see sample_delaunay_topo), the
+        # edges of the triangulation are compared in chunks of points
+        indptr, indices = self.Tri.vertex_neighbor_vertices
+        chunk = 2 ** 16
+        for start in range(0, self.fn, chunk):
+            stop = min(start + chunk, self.fn)
+            ind = numpy.repeat(numpy.arange(start, stop),
+                               numpy.diff(indptr[start:stop + 1]))
+            not_lower = ~(self.F[ind] < self.F[indices[indptr[start]:
+                                                       indptr[stop]]])
+            n_not_lower = numpy.bincount(ind - start, weights=not_lower,
+                                         minlength=stop - start)
+            self.minimizer_pool.extend(
+                (numpy.flatnonzero(n_not_lower == 0) + start).tolist())
 
         self.minimizer_pool_F = self.F[self.minimizer_pool]
 
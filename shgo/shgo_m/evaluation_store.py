@@ -0,0 +1,219 @@
+"""
+Caching of objective function evaluations during a run of shgo and persistent
+storage of them, so that reruns of shgo on the same objective function only
+evaluate new points.
+"""
+from __future__ import division, print_function, absolute_import
+
+import sqlite3
+import threading
+
+import numpy
+
+__all__ = ['EvaluationStore', 'FunctionCache']
+
+
+class EvaluationStore(object):
+    """
+    SQLite database of objective function values keyed by the exact
+    coordinates of the points and a fingerprint of the objective function.
+
+    Parameters
+    ----------
+    path : str
+        Path of the database file, created if it does not exist.
+    fingerprint : str, optional
+        Identifies the objective function (including any extra arguments and
+        the version of the model it evaluates). Values stored under one
+        fingerprint are never returned for another, change it whenever the
+        objective function changes.
+
+    Notes
+    -----
+    Every thread and process opens its own connection to the database, so a
+    store can be used with the ``workers`` argument of shgo. `close` closes
+    the connections, they are opened again if the store is used afterwards.
+    """
+
+    def __init__(self, path, fingerprint=''):
+        self.path = path
+        self.fingerprint = str(fingerprint)
+        self._local = threading.local()
+        self._connections = []  # The connections of all threads
+        self._lock = threading.Lock()
+        self.connection.execute('CREATE TABLE IF NOT EXISTS evaluations '
+                                '(fingerprint TEXT, x BLOB, f REAL, '
+                                'PRIMARY KEY (fingerprint, x))')
+        self.connection.commit()
+
+    @property
+    def connection(self):
+        """The connection of the current thread"""
+        try:
+            return self._local.connection
+        except AttributeError:
+            # Only used by this thread, but closed by the thread calling close
+            connection = sqlite3.connect(self.path, timeout=60,
+                                         check_same_thread=False)
+            with self._lock:
+                self._connections.append(connection)
+            self._local.connection = connection
+            return connection
+
+    def close(self):
+        """Closes the connections of all threads to the database"""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            self._local = threading.local()
+        for connection in connections:
+            connection.close()
+
+    def __getstate__(self):
+        return {'path': self.path, 'fingerprint': self.fingerprint}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(x):
+        """Exact binary representation of the coordinates of a point"""
+        return sqlite3.Binary(numpy.ascontiguousarray(x, dtype=float)
+                              .tobytes())
+
+    def get(self, x):
+        """
+        Returns the stored function value at the point `x` or None.
+        """
+        row = self.connection.execute(
+            'SELECT f FROM evaluations WHERE fingerprint = ? AND x = ?',
+            (self.fingerprint, self.key(x))).fetchone()
+        if row is None:
+            return None
+        # NULL is stored for nan
+        return numpy.nan if row[0] is None else row[0]
+
+    def put(self, X, F):
+        """
+        Stores the function values `F` at the points in the rows of `X`.
+        """
+        with self.connection:  # One transaction
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?)',
+                [(self.fingerprint, self.key(x), float(f))
+                 for x, f in zip(X, F)])
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM evaluations WHERE fingerprint = ?',
+            (self.fingerprint,)).fetchone()[0]
+
+
+class FunctionCache(object):
+    """
+    Cache of the values of the objective function `func` during a run of
+    shgo, shared by the sampling, the simplicial complex and the local
+    minimisation, so that every point is evaluated at most once.
+
+    Values missing from the cache are looked up in the `EvaluationStore`
+    `store` (if any) before `func` is evaluated, and new values are added to
+    both. Single points of shape ``(dim,)`` are evaluated with one call each,
+    arrays of shape ``(dim, N)`` (the ``vectorized`` option of shgo) with
+    one call for all the points that are not known yet.
+
+    Attributes
+    ----------
+    hits : int
+        Number of values taken from the cache or the store.
+    misses : int
+        Number of points at which `func` was evaluated.
+    """
+
+    def __init__(self, func, store=None):
+        self.func = func
+        self.store = store
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Worker processes start with an empty cache, the values they compute
+        # are added to the cache of the main process with `record`
+        return {'func': self.func, 'store': self.store}
+
+    def __setstate__(self, state):
+        self.__init__(state['func'], state['store'])
+
+    @staticmethod
+    def key(x):
+        """Exact binary representation of the coordinates of a point"""
+        return numpy.ascontiguousarray(x, dtype=float).tobytes()
+
+    def known(self, x):
+        """
+        Returns True if the function value at the point `x` is in the cache
+        or the store, values found in the store are added to the cache.
+        """
+        k = self.key(x)
+        if k in self.cache:
+            return True
+        if self.store is not None:
+            f = self.store.get(x)
+            if f is not None:
+                self.cache[k] = f
+                return True
+        return False
+
+    def lookup(self, x):
+        """
+        Returns the known function value at the point `x` or None.
+        """
+        if not self.known(x):
+            return None
+        with self._lock:
+            self.hits += 1
+        return self.cache[self.key(x)]
+
+    def record(self, x, f, store=True):
+        """
+        Adds the value `f` of an evaluation of the objective function at `x`
+        unless it is known already (for example the result of a worker
+        process, or of a worker thread which added it itself).
+        """
+        k = self.key(x)
+        with self._lock:
+            if k in self.cache:
+                return
+            self.cache[k] = f
+            self.misses += 1
+        if store and self.store is not None:
+            self.store.put([x], [f])
+
+    def __call__(self, x, *args):
+        x = numpy.asarray(x, dtype=float)
+        if x.ndim == 1:
+            f = self.lookup(x)
+            if f is None:
+                f = self.func(x, *args)
+                self.record(x, f)
+            return f
+
+        F = numpy.empty(x.shape[1])
+        new = numpy.zeros(x.shape[1], dtype=bool)
+        for i, x_i in enumerate(x.T):
+            f = self.lookup(x_i)
+            if f is None:
+                new[i] = True
+            else:
+                F[i] = f
+        if numpy.any(new):
+            F[new] = self.func(x[:, new], *args)
+            for x_i, f in zip(x[:, new].T, F[new]):
+                self.record(x_i, f, store=False)
+            if self.store is not None:
+                self.store.put(x[:, new].T, F[new])
+        return F
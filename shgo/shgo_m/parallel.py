@@ -0,0 +1,121 @@
+"""
+Parallel evaluation of the objective function at the sampling points of shgo.
+"""
+from __future__ import division, print_function, absolute_import
+
+import multiprocessing
+
+__all__ = ['MapWrapper', 'SampleEvaluator', 'evaluate_points']
+
+
+class MapWrapper(object):
+    """
+    Wraps the ``workers`` argument of shgo in a map-like callable.
+
+    Parameters
+    ----------
+    pool : int, map-like callable or executor, optional
+        If an int, the number of processes of a `multiprocessing.Pool` which
+        is created by the first call (``-1`` uses all the available CPU
+        cores) and closed by `close`; ``1`` evaluates serially with the
+        builtin ``map``. An object with a ``map`` method, such as a
+        ``multiprocessing.Pool`` or a ``concurrent.futures.Executor``, or a
+        map-like callable ``pool(func, iterable)`` is used as is and never
+        closed. The results must be returned in the order of the iterable.
+    """
+
+    def __init__(self, pool=1):
+        self.pool = None
+        self._mapfunc = map
+        self._own_pool = False
+        self._processes = None  # Processes of the pool, None for all cores
+
+        if hasattr(pool, 'map'):
+            self._mapfunc = pool.map
+        elif callable(pool):
+            self._mapfunc = pool
+        else:
+            pool = int(pool)
+            if pool == -1 or pool > 1:
+                self._own_pool = True
+                if pool > 1:
+                    self._processes = pool
+            elif pool != 1:
+                raise ValueError('Number of workers must be a positive '
+                                 'integer or -1.')
+
+        # Serial evaluation in the calling process
+        self.serial = self._mapfunc is map and not self._own_pool
+
+    def __call__(self, func, iterable):
+        if self._own_pool and self.pool is None:
+            self.pool = multiprocessing.Pool(processes=self._processes)
+            self._mapfunc = self.pool.map
+        return list(self._mapfunc(func, iterable))
+
+    def close(self):
+        """Close and join a process pool created by the wrapper"""
+        if self._own_pool and self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.pool is not None and self._own_pool and exc_type is not None:
+            self.pool.terminate()  # Do not wait for pending evaluations
+        self.close()
+
+
+class SampleEvaluator(object):
+    """
+    Picklable evaluation of the constraints and the objective function at a
+    single sampling point. Returns None if the point is infeasible.
+    """
+
+    def __init__(self, func, args=(), g_cons=None, g_args=()):
+        self.func = func
+        self.args = args
+        self.g_cons = g_cons
+        self.g_args = g_args
+
+    def __call__(self, x):
+        if self.g_cons is not None:
+            for g, args in zip(self.g_cons, self.g_args):
+                if g(x, *args) < 0.0:
+                    return None
+
+        return self.func(x, *self.args)
+
+
+def evaluate_points(workers, evaluate, X):
+    """
+    Evaluates the `SampleEvaluator` `evaluate` at the points `X` with the
+    `MapWrapper` `workers` and returns the results in the order of `X`.
+
+    If the objective function is a `FunctionCache`, the points with known
+    function values are evaluated in the calling process and only the other
+    points are passed to the workers. Worker processes start with an empty
+    copy of the cache and would otherwise count the values they take from
+    the evaluation store as new evaluations. The values computed by the
+    workers are added to the cache, they were stored by the workers.
+    """
+    func = evaluate.func
+    if not hasattr(func, 'known'):
+        return workers(evaluate, X)
+
+    F = [None] * len(X)
+    new = []
+    for i, x in enumerate(X):
+        if func.known(x):
+            F[i] = evaluate(x)
+        else:
+            new.append(i)
+    if new:
+        for i, f in zip(new, workers(evaluate, [X[i] for i in new])):
+            F[i] = f
+            if f is not None:
+                func.record(X[i], f, store=False)
+    return F
@@ -0,0 +1,124 @@
+"""
+Storage of the sampling points and their objective function values used by
+the Delaunay complex construction of shgo.
+"""
+from __future__ import division, print_function, absolute_import
+
+import os
+import shutil
+import tempfile
+
+import numpy
+
+__all__ = ['SampleStore']
+
+
+class SampleStore(object):
+    """
+    Growable arrays of the sampling points ``C`` and their function values
+    ``F``.
+
+    New points are appended in place to preallocated arrays whose capacity
+    is doubled when it is exhausted, so that a run of ``N`` sampling points
+    only copies the stored points ``O(log N)`` times instead of every
+    iteration. `C` and `F` are views of the stored part of the arrays, they
+    become stale when the store grows and must be taken again after every
+    `append`.
+
+    Parameters
+    ----------
+    dim : int
+        Spatial dimension of the points.
+    capacity : int, optional
+        Initial number of points that can be stored.
+    directory : str, optional
+        If specified the arrays are `numpy.memmap` files in a new temporary
+        directory inside `directory`, so that the sampling points do not
+        need to fit in memory. The files are removed by `close`.
+    """
+
+    def __init__(self, dim, capacity=1024, directory=None):
+        self.dim = dim
+        self.size = 0
+        self.directory = None
+        if directory is not None:
+            self.directory = tempfile.mkdtemp(prefix='shgo_samples_',
+                                              dir=directory)
+        self._files = []
+        self._C, self._F = self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """Returns new arrays for `capacity` points"""
+        if self.directory is None:
+            return numpy.empty((capacity, self.dim)), numpy.zeros(capacity)
+
+        files = [os.path.join(self.directory, '{}_{}.dat'.format(
+            name, capacity)) for name in ('C', 'F')]
+        C = numpy.memmap(files[0], dtype=float, mode='w+',
+                         shape=(capacity, self.dim))
+        F = numpy.memmap(files[1], dtype=float, mode='w+',
+                         shape=(capacity,))  # New files are zero filled
+        self._files.append(files)
+        return C, F
+
+    def _remove_old_files(self):
+        """Removes the files of arrays replaced by `reserve`"""
+        while len(self._files) > 1:
+            for f in self._files.pop(0):
+                try:
+                    os.remove(f)
+                except OSError:  # Still mapped (Windows), removed by close
+                    pass
+
+    def close(self):
+        """Removes the files of memory-mapped arrays"""
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    @property
+    def capacity(self):
+        return self._C.shape[0]
+
+    @property
+    def C(self):
+        """View of the stored sampling points"""
+        return self._C[:self.size]
+
+    @property
+    def F(self):
+        """View of the function values of the stored sampling points"""
+        return self._F[:self.size]
+
+    def reserve(self, capacity):
+        """
+        Grows the arrays to hold at least `capacity` points (at least
+        doubling the current capacity).
+        """
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        C, F = self._allocate(capacity)
+        C[:self.size] = self._C[:self.size]
+        F[:self.size] = self._F[:self.size]
+        self._C, self._F = C, F
+        self._remove_old_files()
+
+    def append(self, C_new):
+        """
+        Appends the points in the rows of `C_new` with function values 0.
+        """
+        n = numpy.shape(C_new)[0]
+        self.reserve(self.size + n)
+        self._C[self.size:self.size + n] = C_new
+        self._F[self.size:self.size + n] = 0.0
+        self.size += n
+
+    def compress(self, mask):
+        """
+        Keeps only the points where the boolean array `mask` is True, in
+        their current order.
+        """
+        k = numpy.count_nonzero(mask)
+        self._C[:k] = self.C[mask]
+        self._F[:k] = self.F[mask]
+        self.size = k
@@ -0,0 +1,273 @@
+"""
+Low discrepancy and stratified sampling point streams used by the Delaunay
+complex construction of shgo.
+
+Every sampler generates points in the unit hypercube ``[0, 1]^dim`` in bulk
+array operations and remembers how many points it has handed out, so that
+every call to ``next_batch(n)`` only generates the ``n`` new points of an
+iteration (see `Sampler` for the protocol and also
+`shgo.shgo_m.sobol_seq.SobolStream`).
+"""
+from __future__ import division, print_function, absolute_import
+
+import abc
+
+import numpy
+
+__all__ = ['Sampler', 'ArraySampler', 'Halton', 'Lattice', 'LatinHypercube',
+           'primes', 'radical_inverse']
+
+
+def primes(n):
+    """
+    Returns the first `n` prime numbers.
+    """
+    p = []
+    candidate = 2
+    while len(p) < n:
+        if all(candidate % q for q in p if q * q <= candidate):
+            p.append(candidate)
+        candidate += 1
+    return numpy.array(p, dtype=numpy.int64)
+
+
+def radical_inverse(i, base):
+    """
+    Returns the radical inverse in `base` of every index in the integer
+    array `i`, the digits of ``i`` in `base` mirrored about the decimal
+    point.
+    """
+    i = numpy.array(i, dtype=numpy.int64)
+    x = numpy.zeros(i.shape)
+    f = 1.0 / base
+    while numpy.any(i > 0):
+        x += f * (i % base)
+        i //= base
+        f /= base
+    return x
+
+
+# Base class of abstract classes in Python 2 and 3
+_ABC = abc.ABCMeta('_ABC', (object,), {})
+
+
+class Sampler(_ABC):
+    """
+    Abstract base class of the sampler protocol of ``shgo``, subclasses
+    implement `next_batch`.
+
+    Any object with a ``next_batch(n)`` method can be passed to ``shgo`` as
+    the ``sampling_method``, it does not need to inherit from this class.
+    Every iteration shgo calls ``next_batch(n)`` with only the number ``n``
+    of new points needed, the method must return the next ``n`` points of
+    the design in the unit hypercube ``[0, 1]^dim`` as an array of shape
+    ``(n, dim)``. shgo copies the points and scales them to the bounds, so
+    the sampler may return views of its own storage (for example of a
+    ``numpy.memmap`` of a precomputed design).
+
+    Optionally a sampler defines
+
+    * ``dim`` : int
+        The dimension of the points, checked against the bounds.
+    * ``get_state()``
+        Returns an (ideally picklable) object describing the position of
+        the sampler, shgo returns the state after a run as
+        ``res.sampler_state``.
+    * ``set_state(state)``
+        Restores a state returned by ``get_state``, to resume the sequence
+        in a later run.
+
+    Parameters
+    ----------
+    dim : int
+        Spatial dimension of the points.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.index = 0  # Number of points handed out
+
+    @abc.abstractmethod
+    def next_batch(self, n):
+        """
+        Returns the next `n` points of the stream as an array of shape
+        ``(n, dim)`` and advances the stream past them.
+        """
+
+    def get_state(self):
+        """Returns the position of the stream"""
+        return {'index': self.index}
+
+    def set_state(self, state):
+        """Restores a position returned by `get_state`"""
+        self.index = state['index']
+
+
+class ArraySampler(Sampler):
+    """
+    Hands out the rows of a precomputed design in order.
+
+    Parameters
+    ----------
+    points : array_like
+        Array of shape ``(N, dim)`` of points in the unit hypercube, for
+        example a ``numpy.memmap`` of a design stored on disk. Rows are only
+        read when they are handed out.
+    """
+
+    def __init__(self, points):
+        super(ArraySampler, self).__init__(numpy.shape(points)[1])
+        self.points = points
+
+    def next_batch(self, n):
+        """
+        Returns the next `n` rows of the design.
+        """
+        if self.index + n > self.points.shape[0]:
+            raise ValueError('Only {} points are left in the design.'
+                             ''.format(self.points.shape[0] - self.index))
+        points = self.points[self.index:self.index + n]
+        self.index += n
+        return points
+
+
+class Halton(Sampler):
+    """
+    Halton sequence, dimension ``j`` is the radical inverse of the point
+    index in the ``j``-th prime base.
+
+    Parameters
+    ----------
+    dim : int
+        Spatial dimension of the points.
+    skip : int, optional
+        Index of the first point of the stream.
+    """
+
+    def __init__(self, dim, skip=0):
+        super(Halton, self).__init__(dim)
+        self.index = skip
+        self.bases = primes(dim)
+
+    def next_batch(self, n):
+        """
+        Returns the next `n` points of the stream as an array of shape
+        ``(n, dim)`` and advances the stream past them.
+        """
+        i = numpy.arange(self.index, self.index + n)
+        points = numpy.empty((n, self.dim))
+        for j, base in enumerate(self.bases):
+            points[:, j] = radical_inverse(i, base)
+        self.index += n
+        return points
+
+
+class Lattice(Sampler):
+    """
+    Extensible rank-1 lattice sequence in base 2.
+
+    Point ``i`` is ``frac(phi_2(i) * z)`` where ``phi_2`` is the van der
+    Corput radical inverse in base 2 and ``z`` the integer generating vector,
+    so that the first ``2**k`` points of the stream always form a rank-1
+    lattice (Hickernell et al. 2000).
+
+    Parameters
+    ----------
+    dim : int
+        Spatial dimension of the points.
+    skip : int, optional
+        Index of the first point of the stream.
+    z : sequence of int, optional
+        Generating vector. By default it is constructed component-by-component
+        to minimise the worst-case error of a lattice of ``2**m`` points in
+        the Korobov space of smoothness 2 with product weights ``1 / j**2``
+        (Sloan et al. 2002), never repeating a component (up to sign) so
+        that no two coordinates of the points are identical.
+    m : int, optional
+        ``log2`` of the number of points the default generating vector is
+        constructed for.
+    """
+
+    def __init__(self, dim, skip=0, z=None, m=10):
+        super(Lattice, self).__init__(dim)
+        self.index = skip
+        if z is None:
+            z = self.cbc_generating_vector(dim, 2 ** m)
+        self.z = numpy.array(z, dtype=numpy.int64)
+        if self.z.shape != (dim,):
+            raise ValueError('The generating vector must have dim entries.')
+
+    @staticmethod
+    def cbc_generating_vector(dim, n):
+        """
+        Component-by-component construction of a generating vector for a
+        lattice of `n` (a power of 2) points.
+        """
+        k = numpy.arange(n)
+        candidates = numpy.arange(1, n, 2)  # Units modulo 2**m
+
+        def omega(x):  # 2 pi^2 B_2(x), the Korobov kernel of smoothness 2
+            return 2 * numpy.pi ** 2 * (x ** 2 - x + 1.0 / 6.0)
+
+        z = [1]
+        prod = 1.0 + omega(k / n)
+        for j in range(2, dim + 1):
+            kernel = 1.0 + omega(numpy.outer(candidates, k) % n / n) / j ** 2
+            err = numpy.dot(kernel, prod)
+            used = numpy.isin(candidates, z) | numpy.isin(n - candidates, z)
+            if not used.all():
+                err[used] = numpy.inf
+            z_j = candidates[numpy.argmin(err)]
+            z.append(z_j)
+            prod *= 1.0 + omega(k * z_j % n / n) / j ** 2
+        return z
+
+    def next_batch(self, n):
+        """
+        Returns the next `n` points of the stream as an array of shape
+        ``(n, dim)`` and advances the stream past them.
+        """
+        i = numpy.arange(self.index, self.index + n)
+        points = numpy.outer(radical_inverse(i, 2), self.z) % 1.0
+        self.index += n
+        return points
+
+
+class LatinHypercube(Sampler):
+    """
+    Latin hypercube sampling.
+
+    Every batch returned by `next_batch` is a Latin hypercube on its own:
+    each of its ``n`` points lies in a different one of the ``n`` equal
+    strata of every dimension.
+
+    Parameters
+    ----------
+    dim : int
+        Spatial dimension of the points.
+    seed : int, optional
+        Seed of the random permutations and of the positions in the strata.
+    """
+
+    def __init__(self, dim, seed=None):
+        super(LatinHypercube, self).__init__(dim)
+        self.rng = numpy.random.RandomState(seed)
+
+    def next_batch(self, n):
+        """
+        Returns a Latin hypercube of `n` points as an array of shape
+        ``(n, dim)``.
+        """
+        strata = numpy.argsort(self.rng.random_sample((self.dim, n)), axis=1).T
+        points = (strata + self.rng.random_sample((n, self.dim))) / n
+        self.index += n
+        return points
+
+    def get_state(self):
+        """Returns the number of points handed out and the generator state"""
+        return {'index': self.index, 'rng': self.rng.get_state()}
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`"""
+        self.index = state['index']
+        self.rng.set_state(state['rng'])
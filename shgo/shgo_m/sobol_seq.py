@@ -19,9 +19,330 @@
   Modifications:
     Wrapped into Python class [30.10.2017]
 """
+import copy
+import gzip
+import os
+
 import numpy as np
 
-__all__ = ['Sobol']
+from shgo.shgo_m.samplers import Sampler
+
+__all__ = ['Sobol', 'SobolStream', 'gray_code_points',
+           'i4_sobol_generate_10k', 'joe_kuo_direction_numbers',
+           'joe_kuo_table', 'load_joe_kuo_table', 'sobol_cache_dir']
+
+# Joe and Kuo (2008) direction number table, opened once per process
+_joe_kuo = {}
+# Name of its binary version in sobol_cache_dir
+_joe_kuo_npy = 'sobol_vec_v1.npy'
+
+
+def gray_code_points(v, n, skip=0):
+    """
+    gray_code_points generates the integer numerators of a block of
+    consecutive Sobol points.
+
+    Discussion:
+      The numerator of point SEED is the exclusive or of the direction
+      numbers V(:,K) for every bit K set in the Gray code SEED ^ (SEED >> 1).
+      Only the first point of the block is built from its Gray code, every
+      following point differs from its predecessor in the direction number
+      of the low zero bit of the previous seed (Antonov and Saleev), so the
+      block is a single cumulative exclusive or down its rows.
+
+    Parameters:
+      Input, integer V(DIM_NUM, MAXCOL), the direction numbers.
+      Input, integer N, the number of points to generate.
+      Input, integer SKIP, the seed of the first point, SKIP >= 0.
+
+      Output, integer Q(N, DIM_NUM), the numerators of the points.
+    """
+    v = np.asarray(v).astype(np.uint64)
+    dim_num, maxcol = v.shape
+    q = np.zeros((n, dim_num), dtype=np.uint64)
+    if n < 1:
+        return q
+
+    skip = int(skip)
+    if skip + n > 2 ** maxcol:
+        raise ValueError('Too many points requested, only 2**{} points are '
+                         'available with these direction numbers.'
+                         ''.format(maxcol))
+
+    # First point directly from the Gray code of its seed
+    gray = skip ^ (skip >> 1)
+    for k in range(maxcol):
+        if (gray >> k) & 1:
+            q[0] ^= v[:, k]
+
+    # Column of V that changes between seed and seed + 1, the position of
+    # the low zero bit of seed (found as the exponent of (seed + 1) & ~seed)
+    seeds = np.arange(skip, skip + n - 1, dtype=np.int64)
+    col = np.frexp(((seeds + 1) & ~seeds).astype(float))[1] - 1
+    q[1:] = v[:, col].T
+    np.bitwise_xor.accumulate(q, axis=0, out=q)
+    return q
+
+
+def sobol_cache_dir():
+    """
+    sobol_cache_dir returns the directory holding the binary direction
+    number table.
+
+    Discussion:
+      The directory is $SHGO_CACHE_DIR if it is set, otherwise
+      $XDG_CACHE_HOME/shgo (~/.cache/shgo by default).
+    """
+    cache_dir = os.environ.get('SHGO_CACHE_DIR')
+    if cache_dir is None:
+        cache_dir = os.path.join(
+            os.environ.get('XDG_CACHE_HOME',
+                           os.path.join(os.path.expanduser('~'), '.cache')),
+            'shgo')
+    return cache_dir
+
+
+def joe_kuo_table():
+    """
+    joe_kuo_table parses sobol_vec.gz and computes the direction numbers of
+    every dimension of the Joe and Kuo (2008) table.
+
+    Discussion:
+      Adapted from sobol.cc by Frances Kuo and Stephen Joe, the original
+      program is available and described at
+      http://web.maths.unsw.edu.au/~fkuo/sobol/
+
+    Parameters:
+      Output, integer V(10000, 32), the direction numbers scaled to 32 bits.
+    """
+    path = os.path.join(os.path.dirname(__file__), 'sobol_vec.gz')
+    with gzip.open(path, 'rb') as f:
+        next(f)  # swallow header
+        rows = [[int(item) for item in line.split()] for line in f]
+
+    # The first dimension uses m_i = 1 for all i
+    v = [[1 << (32 - i) for i in range(1, 33)]]
+    for row in rows:
+        (_, s, a), m = row[:3], [0] + row[3:]
+        V = [0] * 33
+        for i in range(1, min(s, 32) + 1):
+            V[i] = m[i] << (32 - i)
+        for i in range(s + 1, 33):
+            V[i] = V[i - s] ^ (V[i - s] >> s)
+            for k in range(1, s):
+                V[i] ^= ((a >> (s - 1 - k)) & 1) * V[i - k]
+        v.append(V[1:])
+
+    return np.array(v, dtype=np.uint32)
+
+
+def load_joe_kuo_table():
+    """
+    load_joe_kuo_table returns the direction number table of joe_kuo_table
+    as a read-only memory map of a binary .npy file in sobol_cache_dir.
+
+    Discussion:
+      The binary file is built on the first use on a machine, afterwards
+      only the pages of the rows that are actually used are read from disk
+      and processes on the same machine share one page-cache copy.  If the
+      cache directory is not writable the table is held in memory instead.
+    """
+    cache_dir = sobol_cache_dir()
+    path = os.path.join(cache_dir, _joe_kuo_npy)
+    try:
+        return np.load(path, mmap_mode='r')
+    except (IOError, OSError, ValueError):
+        pass  # Missing or incomplete, (re)build it below
+
+    v = joe_kuo_table()
+    # Write to a private file first so that concurrent processes never map a
+    # partially written table
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(tmp_path, 'wb') as f:
+            np.save(f, v)
+        getattr(os, 'replace', os.rename)(tmp_path, path)
+        return np.load(path, mmap_mode='r')
+    except (IOError, OSError):
+        try:
+            os.remove(tmp_path)
+        except (IOError, OSError):
+            pass  # Not created
+        return v
+
+
+def joe_kuo_direction_numbers(dim_num):
+    """
+    joe_kuo_direction_numbers returns the direction numbers of the first
+    DIM_NUM dimensions of the Joe and Kuo (2008) table.
+
+    Discussion:
+      The table is opened once per process with load_joe_kuo_table, the
+      rows returned are a view of its memory map.
+
+    Parameters:
+      Input, integer DIM_NUM, the number of spatial dimensions.
+      DIM_NUM must satisfy 1 <= DIM_NUM <= 10000.
+
+      Output, integer V(DIM_NUM, 32), the direction numbers scaled to 32 bits.
+    """
+    if 'v' not in _joe_kuo:
+        _joe_kuo['v'] = load_joe_kuo_table()
+
+    v = _joe_kuo['v']
+    if dim_num > v.shape[0]:
+        raise ValueError('Only {} dimensions are available for high '
+                         'dimensional Sobol sampling.'.format(v.shape[0]))
+
+    return v[:dim_num]
+
+
+def i4_sobol_generate_10k(dim_num, n, skip=0):
+    """
+    i4_sobol_generate_10k generates a Sobol dataset in up to 10000
+    dimensions from the direction numbers of Joe and Kuo (2008).
+
+    Parameters:
+      Input, integer DIM_NUM, the spatial dimension.
+      Input, integer N, the number of points to generate.
+      Input, integer SKIP, the number of initial points to skip.
+
+      Output, real R(N,DIM_NUM), the points.
+    """
+    v = joe_kuo_direction_numbers(dim_num)
+    return gray_code_points(v, n, skip) / 2.0 ** 32
+
+
+class SobolStream(Sampler):
+    """
+    A resumable, optionally scrambled, stream of Sobol points.
+
+    The stream remembers the index of the next point in the sequence so that
+    every call to `next_batch` only generates points that have not been
+    handed out before.
+
+    Parameters
+    ----------
+    dim : int
+        Spatial dimension of the points. The direction numbers of
+        `Sobol.i4_sobol` are used for ``dim < 40`` and those of
+        `joe_kuo_direction_numbers` otherwise.
+    skip : int, optional
+        Index of the first point of the stream.
+    scramble : bool, optional
+        If True the sequence is randomised with a linear matrix scramble and
+        a digital shift (Matousek 1998). Every point is still uniformly
+        distributed and every block of ``2**m`` points starting at a
+        multiple of ``2**m`` keeps the net property of the unscrambled
+        sequence.
+    seed : int, optional
+        Seed of the scramble, the same seed always gives the same sequence.
+
+    Examples
+    --------
+    Split a budget of ``4 * 1024`` points of one scrambled sequence over four
+    workers, each worker passes its stream to ``shgo`` as the
+    ``sampling_method``:
+
+    >>> from shgo.shgo_m.sobol_seq import SobolStream
+    >>> streams = SobolStream(2, scramble=True, seed=1).substreams(4, 1024)
+    >>> streams[1].index, streams[1].stop
+    (1024, 2048)
+    """
+
+    def __init__(self, dim, skip=0, scramble=False, seed=None):
+        super(SobolStream, self).__init__(dim)
+        self.index = skip
+        self.stop = None  # Last index (exclusive) of a substream
+        if dim < 40:
+            sobol = Sobol()
+            sobol.i4_sobol_init(dim)
+            self.v = sobol.v[0:dim, 0:sobol.maxcol].astype(np.uint64)
+            self.recipd = sobol.recipd
+        else:
+            self.v = joe_kuo_direction_numbers(dim).astype(np.uint64)
+            self.recipd = 1.0 / 2 ** 32
+
+        self.scramble = scramble
+        self.seed = seed
+        self.shift = None
+        if scramble:
+            self.scramble_direction_numbers(seed)
+
+    def scramble_direction_numbers(self, seed=None):
+        """
+        Applies a random linear matrix scramble to the direction numbers and
+        draws the random digital shift of every dimension.
+        """
+        rng = np.random.RandomState(seed)
+        dim, maxcol = self.v.shape
+        bits = int(round(-np.log2(self.recipd)))
+        # Bit c of a direction number (c = 0 is the most significant bit)
+        shifts = np.arange(bits - 1, -1, -1, dtype=np.uint64)
+        v_bits = ((self.v[:, :, None] >> shifts) & np.uint64(1)).astype(int)
+
+        # Random lower triangular matrices with a unit diagonal
+        ltm = np.tril(rng.randint(0, 2, size=(dim, bits, bits)), k=-1)
+        ltm[:, np.arange(bits), np.arange(bits)] = 1
+
+        v_bits = np.einsum('jrc,jkc->jkr', ltm, v_bits) % 2
+        self.v = np.sum(v_bits.astype(np.uint64) << shifts, axis=-1,
+                        dtype=np.uint64)
+        self.shift = rng.randint(0, 2 ** bits, size=dim).astype(np.uint64)
+
+    def next_batch(self, n):
+        """
+        Returns the next `n` points of the stream as an array of shape
+        ``(n, dim)`` and advances the stream past them.
+        """
+        if self.stop is not None and self.index + n > self.stop:
+            raise ValueError('Only {} points are left in this Sobol '
+                             'substream.'.format(self.stop - self.index))
+        q = gray_code_points(self.v, n, self.index)
+        if self.shift is not None:
+            q ^= self.shift
+        self.index += n
+        return q * self.recipd
+
+    def get_state(self):
+        """Returns the position (and end) of the stream"""
+        return {'index': self.index, 'stop': self.stop}
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`"""
+        self.index = state['index']
+        self.stop = state['stop']
+
+    def substreams(self, k, size):
+        """
+        Splits the remainder of the stream into `k` non-overlapping
+        substreams of `size` consecutive points each.
+
+        The substreams share the scramble of this stream, together they
+        cover the same points as drawing ``k * size`` points from it. Choose
+        `size` as a power of two (and start the stream at a multiple of it)
+        so that every substream is itself a net.
+
+        Parameters
+        ----------
+        k : int
+            Number of substreams, usually one per worker.
+        size : int
+            Number of points available to every substream.
+
+        Returns
+        -------
+        streams : list of SobolStream
+        """
+        streams = []
+        for i in range(k):
+            stream = copy.copy(self)
+            stream.index = self.index + i * size
+            stream.stop = stream.index + size
+            streams.append(stream)
+        return streams
 
 
 class Sobol:
@@ -43,6 +364,11 @@ class Sobol:
         """
         i4_sobol_generate generates a Sobol dataset.
 
+        Discussion:
+          The whole dataset is built at once with gray_code_points from the
+          direction numbers of I4_SOBOL, the points are identical to those
+          returned by N successive calls to I4_SOBOL.
+
         Parameters:
           Input, integer dim_num, the spatial dimension.
           Input, integer N, the number of points to generate.
@@ -50,10 +376,9 @@ class Sobol:
 
           Output, real R(M,N), the points.
         """
-        r = np.full((n, dim_num), np.nan)
-        for j in range(n):
-            seed = j + skip
-            r[j, 0:dim_num], next_seed = self.i4_sobol(dim_num, seed)
+        self.i4_sobol_init(dim_num)
+        v = self.v[0:dim_num, 0:self.maxcol]
+        r = gray_code_points(v, n, skip) * self.recipd
 
         return r
 
@@ -144,55 +469,18 @@ class Sobol:
             i //= 2
         return bit
 
-    def i4_sobol(self, dim_num, seed):
+    def i4_sobol_init(self, dim_num):
         """
-        i4_sobol generates a new quasirandom Sobol vector with each call.
+        i4_sobol_init initializes the direction numbers V used by I4_SOBOL.
 
         Discussion:
-          The routine adapts the ideas of Antonov and Saleev.
-
-        Reference:
-          Antonov, Saleev,
-          USSR Computational Mathematics and Mathematical Physics,
-          Volume 19, 1980, pages 252 - 256.
-
-          Paul Bratley, Bennett Fox,
-          Algorithm 659:
-          Implementing Sobol's Quasirandom Sequence Generator,
-          ACM Transactions on Mathematical Software,
-          Volume 14, Number 1, pages 88-100, 1988.
-
-          Bennett Fox,
-          Algorithm 647:
-          Implementation and Relative Efficiency of Quasirandom
-          Sequence Generators,
-          ACM Transactions on Mathematical Software,
-          Volume 12, Number 4, pages 362-376, 1986.
-
-          Ilya Sobol,
-          USSR Computational Mathematics and Mathematical Physics,
-          Volume 16, pages 236-242, 1977.
-
-          Ilya Sobol, Levitan,
-          The Production of Points Uniformly Distributed in a Multidimensional
-          Cube (in Russian),
-          Preprint IPM Akad. Nauk SSSR,
-          Number 40, Moscow 1976.
+          The table is only rebuilt on the first call or when DIM_NUM
+          changes.
 
         Parameters:
           Input, integer DIM_NUM, the number of spatial dimensions.
           DIM_NUM must satisfy 1 <= DIM_NUM <= 40.
-
-          Input/output, integer SEED, the "seed" for the sequence.
-          This is essentially the index in the sequence of the quasirandom
-          value to be generated.  On output, SEED has been set to the
-          appropriate next value, usually simply SEED+1.
-          If SEED is less than 0 on input, it is treated as though it were 0.
-          An input value of 0 requests the first (0-th) element of the sequence.
-
-          Output, real QUASI(DIM_NUM), the next quasirandom vector.
         """
-
         # if 'self.initialized' not in list(globals().keys()):
         if self.initialized is None:
             self.initialized = 0
@@ -314,6 +602,57 @@ class Sobol:
             self.recipd = 1.0 / (2 * lseed)
             self.lastq = np.zeros(dim_num)
 
+    def i4_sobol(self, dim_num, seed):
+        """
+        i4_sobol generates a new quasirandom Sobol vector with each call.
+
+        Discussion:
+          The routine adapts the ideas of Antonov and Saleev.
+
+        Reference:
+          Antonov, Saleev,
+          USSR Computational Mathematics and Mathematical Physics,
+          Volume 19, 1980, pages 252 - 256.
+
+          Paul Bratley, Bennett Fox,
+          Algorithm 659:
+          Implementing Sobol's Quasirandom Sequence Generator,
+          ACM Transactions on Mathematical Software,
+          Volume 14, Number 1, pages 88-100, 1988.
+
+          Bennett Fox,
+          Algorithm 647:
+          Implementation and Relative Efficiency of Quasirandom
+          Sequence Generators,
+          ACM Transactions on Mathematical Software,
+          Volume 12, Number 4, pages 362-376, 1986.
+
+          Ilya Sobol,
+          USSR Computational Mathematics and Mathematical Physics,
+          Volume 16, pages 236-242, 1977.
+
+          Ilya Sobol, Levitan,
+          The Production of Points Uniformly Distributed in a Multidimensional
+          Cube (in Russian),
+          Preprint IPM Akad. Nauk SSSR,
+          Number 40, Moscow 1976.
+
+        Parameters:
+          Input, integer DIM_NUM, the number of spatial dimensions.
+          DIM_NUM must satisfy 1 <= DIM_NUM <= 40.
+
+          Input/output, integer SEED, the "seed" for the sequence.
+          This is essentially the index in the sequence of the quasirandom
+          value to be generated.  On output, SEED has been set to the
+          appropriate next value, usually simply SEED+1.
+          If SEED is less than 0 on input, it is treated as though it were 0.
+          An input value of 0 requests the first (0-th) element of the sequence.
+
+          Output, real QUASI(DIM_NUM), the next quasirandom vector.
+        """
+
+        self.i4_sobol_init(dim_num)
+
         seed = int(np.floor(seed))
 
         if seed < 0:
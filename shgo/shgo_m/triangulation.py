@@ -1,106 +1,156 @@
 import numpy
 import copy
+import itertools
+import os
+
+from shgo.shgo_m.parallel import SampleEvaluator, evaluate_points
+from shgo.shgo_m.sobol_seq import SobolStream
+
+# The vertices of the complex are points of the dyadic lattice of the unit
+# hypercube with spacing 2**-LATTICE_BITS. They are stored under the bytes of
+# their exact integer coordinates (int64), their floating point coordinates
+# are only computed when they are needed.
+LATTICE_BITS = 62
+LATTICE_SCALE = 2 ** LATTICE_BITS
+
+
+def lattice_keys(K):
+    """
+    Returns the keys of the lattice points with integer coordinates in the
+    rows of `K`
+    """
+    K = numpy.ascontiguousarray(K, dtype=numpy.int64)
+    return K.view(numpy.dtype((numpy.void, K.shape[-1] * 8))).ravel().tolist()
+
+
+def lattice_points(keys):
+    """
+    Returns the integer coordinates of the lattice points `keys` in the rows
+    of an array
+    """
+    return numpy.frombuffer(b''.join(keys), dtype=numpy.int64).reshape(
+        len(keys), -1)
+
+
+def lattice_key(x):
+    """
+    Returns the key of the lattice point at the coordinates `x` of the unit
+    hypercube
+    """
+    x = numpy.asarray(x, dtype=float)
+    if numpy.any((x < 0.0) | (x > 1.0)):
+        raise ValueError("The vertices of the complex must be in the unit "
+                         "hypercube")
+    K = numpy.rint(x * float(LATTICE_SCALE))
+    return lattice_keys(K[None, :])[0]
 
-try:
-    from functools import lru_cache  # For Python 3 only
-except ImportError:  # Python 2:
-    import time
-    import functools
-    import collections
-
-    # Note to avoid using external packages such as functools32 we use this code
-    # only using the standard library
-    def lru_cache(maxsize=255, timeout=None):
-        """
-        Thanks to ilialuk @ https://stackoverflow.com/users/2121105/ilialuk for
-        this code snippet. Modifications by S. Endres
-        """
-
-        class LruCacheClass(object):
-            def __init__(self, input_func, max_size, timeout):
-                self._input_func = input_func
-                self._max_size = max_size
-                self._timeout = timeout
-
-                # This will store the cache for this function,
-                # format - {caller1 : [OrderedDict1, last_refresh_time1],
-                #  caller2 : [OrderedDict2, last_refresh_time2]}.
-                #   In case of an instance method - the caller is the instance,
-                # in case called from a regular function - the caller is None.
-                self._caches_dict = {}
-
-            def cache_clear(self, caller=None):
-                # Remove the cache for the caller, only if exists:
-                if caller in self._caches_dict:
-                    del self._caches_dict[caller]
-                    self._caches_dict[caller] = [collections.OrderedDict(),
-                                                 time.time()]
-
-            def __get__(self, obj, objtype):
-                """ Called for instance methods """
-                return_func = functools.partial(self._cache_wrapper, obj)
-                return_func.cache_clear = functools.partial(self.cache_clear,
-                                                            obj)
-                # Return the wrapped function and wraps it to maintain the
-                # docstring and the name of the original function:
-                return functools.wraps(self._input_func)(return_func)
-
-            def __call__(self, *args, **kwargs):
-                """ Called for regular functions """
-                return self._cache_wrapper(None, *args, **kwargs)
-
-            # Set the cache_clear function in the __call__ operator:
-            __call__.cache_clear = cache_clear
-
-            def _cache_wrapper(self, caller, *args, **kwargs):
-                # Create a unique key including the types (in order to
-                # differentiate between 1 and '1'):
-                kwargs_key = "".join(map(
-                    lambda x: str(x) + str(type(kwargs[x])) + str(kwargs[x]),
-                    sorted(kwargs)))
-                key = "".join(
-                    map(lambda x: str(type(x)) + str(x), args)) + kwargs_key
-
-                # Check if caller exists, if not create one:
-                if caller not in self._caches_dict:
-                    self._caches_dict[caller] = [collections.OrderedDict(),
-                                                 time.time()]
-                else:
-                    # Validate in case the refresh time has passed:
-                    if self._timeout is not None:
-                        if (time.time() - self._caches_dict[caller][1]
-                                > self._timeout):
-                            self.cache_clear(caller)
-
-                # Check if the key exists, if so - return it:
-                cur_caller_cache_dict = self._caches_dict[caller][0]
-                if key in cur_caller_cache_dict:
-                    return cur_caller_cache_dict[key]
-
-                # Validate we didn't exceed the max_size:
-                if len(cur_caller_cache_dict) >= self._max_size:
-                    # Delete the first item in the dict:
-                    try:
-                        cur_caller_cache_dict.popitem(False)
-                    except KeyError:
-                        pass
-                # Call the function and store the data in the cache (call it
-                # with the caller in case it's an instance function)
-                if caller is not None:
-                    args = (caller,) + args
-                cur_caller_cache_dict[key] = self._input_func(*args, **kwargs)
-
-                return cur_caller_cache_dict[key]
-
-        # Return the decorator wrapping the class (also wraps the instance to
-        # maintain the docstring and the name of the original function):
-        return (lambda input_func: functools.wraps(input_func)(
-            LruCacheClass(input_func, maxsize, timeout)))
+
+def lattice_coordinates(key):
+    """
+    Returns the coordinates in the unit hypercube (tuple) of the lattice
+    point `key`
+    """
+    return tuple((numpy.frombuffer(key, dtype=numpy.int64)
+                  / float(LATTICE_SCALE)).tolist())
+
+
+# Triangulations of the unit hypercube by dimension (see cube_template)
+_cube_templates = {}
+
+
+def cube_template(dim, directory=None):
+    """
+    Returns the Kuhn (Freudenthal) triangulation of the unit hypercube of
+    dimension `dim` used as the initial cell of the complex.
+
+    The triangulations are cached in memory, and in the directory
+    `directory` (``.npz`` files) if it is specified, so that they are only
+    constructed once for every dimension.
+
+    Returns
+    -------
+    X : array
+        The ``2**dim`` vertices (0 and 1 coordinates) in the order of the
+        vertices of the initial cell: the origin, the supremum and the other
+        vertices in the lexicographic order of the (sorted) indexes of their
+        coordinates equal to 1.
+    edges : tuple
+        Index arrays ``I, J`` of the edges between the vertices ``X[I[k]]``
+        and ``X[J[k]]``, which are all the pairs of vertices with
+        ``X[I[k]] <= X[J[k]]`` (each of the ``dim!`` simplices of the
+        triangulation is a chain of vertices from the origin to the
+        supremum).
+    """
+    template = _cube_templates.get(dim)
+    path = None
+    if directory is not None:
+        path = os.path.join(directory, 'n_cube_{}.npz'.format(dim))
+        if os.path.exists(path):
+            if template is None:
+                with numpy.load(path) as data:
+                    template = data['X'], (data['I'], data['J'])
+                _cube_templates[dim] = template
+            return template
+
+    if template is None:
+        template = _cube_template(dim)
+        _cube_templates[dim] = template
+
+    if path is not None:
+        # Write to a private file first so that concurrent processes never
+        # load a partially written template
+        tmp = path + '.{}.tmp.npz'.format(os.getpid())
+        try:
+            numpy.savez(tmp, X=template[0], I=template[1][0],
+                        J=template[1][1])
+            getattr(os, 'replace', os.rename)(tmp, path)
+        except (IOError, OSError):  # Read only directory
+            try:
+                os.remove(tmp)
+            except (IOError, OSError):
+                pass  # Not created
+    return template
+
+
+def _cube_template(dim):
+    """Constructs the triangulation of the hypercube (see cube_template)"""
+    # The vertices are the bit masks of their coordinates equal to 1, found
+    # in lexicographic order with a stack of (mask, next index) pairs
+    masks = []
+    stack = [(0, 0)]
+    while stack:
+        mask, i_0 = stack.pop()
+        masks.append(mask)
+        stack.extend((mask | 1 << i, i + 1)
+                     for i in reversed(range(i_0, dim)))
+    full = (1 << dim) - 1
+    masks = numpy.array([0, full] + [m for m in masks if m not in (0, full)],
+                        dtype=numpy.int64)
+    X = (masks[:, None] >> numpy.arange(dim)) & 1
+
+    # The pairs (lo, hi) of masks with lo < hi (as sets) of the hypercube of
+    # dimension d + 1 are the pairs of dimension d, with and without bit d
+    # set in hi and in both masks, and the pairs (m, m | bit d)
+    lo = numpy.zeros(0, dtype=numpy.int64)
+    hi = numpy.zeros(0, dtype=numpy.int64)
+    for d in range(dim):
+        bit = 1 << d
+        m = numpy.arange(bit, dtype=numpy.int64)
+        lo, hi = (numpy.concatenate((lo, lo | bit, lo, m)),
+                  numpy.concatenate((hi, hi | bit, hi | bit, m | bit)))
+
+    # Index of every mask in the order of the vertices
+    index = numpy.empty(len(masks), dtype=numpy.int64)
+    index[masks] = numpy.arange(len(masks))
+    return X, (index[lo], index[hi])
 
 
 class Complex:
     def __init__(self, dim, func, func_args=(), symmetry=False, bounds=None,
-                 g_cons=None, g_args=()):
+                 g_cons=None, g_args=(), vectorized=False, workers=None,
+                 vertex_store='arrays', split_workers=None,
+                 refinement='uniform', refinement_neighbourhood=1,
+                 template_dir=None):
         self.dim = dim
         self.bounds = bounds
         self.symmetry = symmetry  # TODO: Define the functions to be used
@@ -114,8 +164,36 @@ class Complex:
         # When a cell is subgenerated it is removed from this list
 
         self.H = []  # Storage structure of cells
-        # Cache of all vertices
-        self.V = VertexCache(func, func_args, bounds, g_cons, g_args)
+        # Cache of all vertices, stored in arrays (VertexStore) or as a graph
+        # of Vertex objects (VertexCache)
+        if vertex_store == 'arrays':
+            vertex_cache = VertexStore
+        elif vertex_store == 'objects':
+            vertex_cache = VertexCache
+        else:
+            raise ValueError("vertex_store must be 'arrays' or 'objects'")
+        self.V = vertex_cache(func, func_args, bounds, g_cons, g_args,
+                              vectorized=vectorized, workers=workers)
+        # Map-like callable used to split the cells of a generation in
+        # parallel (see split_cells), None splits them one at a time
+        self.split_workers = split_workers
+        # Cells split by split_generation: 'uniform' splits every cell,
+        # 'minimisers' only the cells near the minimisers (see refined_cells)
+        if refinement not in ('uniform', 'minimisers'):
+            raise ValueError("refinement must be 'uniform' or 'minimisers'")
+        # The simplices of the symmetry mode are always split uniformly
+        self.refinement = 'uniform' if symmetry else refinement
+        self.refinement_neighbourhood = refinement_neighbourhood
+        # Directory of the triangulations of the initial hypercube
+        self.template_dir = template_dir
+        # In a uniformly split complex of hypercube cells every edge is an
+        # edge of the template graph of one of the cells of the current
+        # generation, whose vertex indexes are then kept in the rows of
+        # cell_vertices (see minimisers)
+        self.uniform_cells = (vertex_store == 'arrays' and not symmetry
+                              and refinement == 'uniform')
+        self.cell_vertices = None
+        self.new_cell_vertices = None
 
         # Generate n-cube here:
         self.n_cube(dim, symmetry=symmetry)
@@ -128,6 +206,9 @@ class Complex:
         else:
             self.add_centroid()
 
+        # Evaluate the vertices of the initial cell (vectorized or parallel)
+        self.V.process_pools()
+
         self.H.append([])
         self.H[0].append(self.C0)
         self.hgr = self.C0.homology_group_rank()
@@ -136,6 +217,8 @@ class Complex:
 
         # Build initial graph
         self.graph_map()
+        if self.uniform_cells:
+            self.cell_vertices = numpy.array([[v.index for v in self.C0()]])
 
         self.performance = []
         self.performance.append(0)
@@ -169,48 +252,16 @@ class Complex:
             self.perm_symmetry(i_s, x_parents, origin)
             self.C0.add_vertex(self.V[supremumtuple])
         else:
-            self.C0 = Cell(0, 0, origin, supremum)  # Initial cell object
-            self.C0.add_vertex(self.V[origintuple])
-            self.C0.add_vertex(self.V[supremumtuple])
-
-            i_parents = []
-            self.perm(i_parents, x_parents, origin)
+            self.C0 = Cell(0, 0, lattice_key(origin), lattice_key(supremum))
+            X, edges = cube_template(dim, self.template_dir)
+            self.C0.C = [self.V[k] for k in lattice_keys(LATTICE_SCALE * X)]
+            self.V.connect_graph(self.C0(), edges)
 
         if printout:
             print("Initial hyper cube:")
             for v in self.C0():
                 v.print_out()
 
-    def perm(self, i_parents, x_parents, xi):
-        # TODO: Cut out of for if outside linear constraint cutting planes
-        xi_t = tuple(xi)
-
-        # Construct required iterator
-        iter_range = [x for x in range(self.dim) if x not in i_parents]
-
-        for i in iter_range:
-            i2_parents = copy.copy(i_parents)
-            i2_parents.append(i)
-            xi2 = copy.copy(xi)
-            xi2[i] = 1
-            # Make new vertex list a hashable tuple
-            xi2_t = tuple(xi2)
-            # Append to cell
-            self.C0.add_vertex(self.V[xi2_t])
-            # Connect neighbours and vice versa
-            # Parent point
-            self.V[xi2_t].connect(self.V[xi_t])
-
-            # Connect all family of simplices in parent containers
-            for x_ip in x_parents:
-                self.V[xi2_t].connect(self.V[x_ip])
-
-            x_parents2 = copy.copy(x_parents)
-            x_parents2.append(xi_t)
-
-            # Permutate
-            self.perm(i2_parents, x_parents2, xi2)
-
     def perm_symmetry(self, i_s, x_parents, xi):
         # TODO: Cut out of for if outside linear constraint cutting planes
         xi_t = tuple(xi)
@@ -243,14 +294,13 @@ class Complex:
         self.centroid = list(
             (numpy.array(self.origin) + numpy.array(self.supremum)) / 2.0)
         self.C0.add_vertex(self.V[tuple(self.centroid)])
-        self.C0.centroid = self.centroid
+        self.C0.centroid = self.C0()[-1].key
 
         # Disconnect origin and supremum
         self.V[tuple(self.origin)].disconnect(self.V[tuple(self.supremum)])
 
         # Connect centroid to all other vertices
-        for v in self.C0():
-            self.V[tuple(self.centroid)].connect(self.V[tuple(v.x)])
+        self.V[tuple(self.centroid)].connect_all(self.C0())
 
         self.centroid_added = True
         return
@@ -278,6 +328,15 @@ class Complex:
 
         self.graph = [[v2.index for v2 in v.nn] for v in self.C0()]
 
+        # Template of the sub cells built by construct_hypercube: the
+        # 0, 1 coordinates of the vertices of C0 (without the centroid) in the
+        # rows of a matrix and the edges of the graph as index arrays
+        self.template = numpy.array([v.x for v in self.C0()[:-1]],
+                                    dtype=numpy.int64)
+        self.graph_edges = numpy.array(
+            [(i, j) for i, c in enumerate(self.graph) for j in c if i < j],
+            dtype=int).reshape(-1, 2).T
+
     # Graph structure method:
     # 0. Capture the indices of the initial cell.
     # 1. Generate new origin and supremum scalars based on current generation
@@ -286,11 +345,11 @@ class Complex:
     # 3. Connected based on the indices of the previous graph structure
     # 4. Disconnect the edges in the original cell
 
-    def sub_generate_cell(self, C_i, gen):
+    def sub_generate_cell(self, C_i, gen, disconnect=True):
         """Subgenerate a cell `C_i` of generation `gen` and
-        homology group rank `hgr`."""
-        origin_new = tuple(C_i.centroid)
-        centroid_index = len(C_i()) - 1
+        homology group rank `hgr`. The edges of `C_i` are disconnected
+        unless `disconnect` is False."""
+        origin_new = C_i()[-1].key  # The centroid of C_i
 
         # If not gen append
         try:
@@ -301,18 +360,14 @@ class Complex:
         # Generate subcubes using every extreme vertex in C_i as a supremum
         # and the centroid of C_i as the origin
         H_new = []  # list storing all the new cubes split from C_i
-        for i, v in enumerate(C_i()[:-1]):
-            supremum = tuple(v.x)
+        for v in C_i()[:-1]:
             H_new.append(
-                self.construct_hypercube(origin_new, supremum, gen, C_i.hg_n))
-
-        for i, connections in enumerate(self.graph):
-            # Present vertex V_new[i]; connect to all connections:
-            if i == centroid_index:  # Break out of centroid
-                break
+                self.construct_hypercube(origin_new, v.key, gen, C_i.hg_n))
 
-            for j in connections:
-                C_i()[i].disconnect(C_i()[j])
+        # Disconnect the vertices of C_i (every edge of the template has a
+        # vertex other than the centroid)
+        if disconnect:
+            self.V.disconnect_graph(C_i(), self.graph_edges)
 
         # Destroy the old cell
         if C_i is not self.C0:  # Garbage collector does this anyway; not needed
@@ -321,25 +376,281 @@ class Complex:
         # TODO: Recalculate all the homology group ranks of each cell
         return H_new
 
+    def refined_cells(self, cells):
+        """
+        Separates the cells to split with the 'minimisers' refinement from
+        the cells to keep.
+
+        A cell is split if one of its vertices is a minimiser or is within
+        `refinement_neighbourhood` edges of one, every cell is split if the
+        complex has no minimiser yet.
+
+        Returns
+        -------
+        split : list
+            The cells to split.
+        kept : list
+            The other cells.
+        """
+        near = set(v for v in self.V.cache.values() if v.minimiser())
+        if not near:
+            return cells, []
+        layer = near
+        for _ in range(self.refinement_neighbourhood):
+            layer = set(v_n for v in layer for v_n in v.nn) - near
+            near |= layer
+
+        split = []
+        kept = []
+        for c in cells:
+            if any(v in near for v in c()):
+                split.append(c)
+            else:
+                kept.append(c)
+        return split, kept
+
+    def refine_cells(self, cells, kept, gen):
+        """
+        Subgenerate the cells `cells` into generation `gen` and carry over
+        the cells `kept` (see refined_cells).
+
+        A vertex added on the boundary of a cell which is not one of its
+        vertices (hanging on the face shared with a split neighbour) is
+        connected to the vertices of the simplices of the cell containing it
+        (see boundary_star), which refines the triangulation of the cell
+        around it. An edge of the split cells is only disconnected if it is
+        not an edge of a cell of generation `gen`, so the kept cells keep
+        all their edges and every vertex stays connected to the vertices
+        surrounding it.
+        """
+        while len(self.H) <= gen:
+            self.H.append([])
+        index = self.V.index
+        if self.split_workers is not None:
+            self.split_cells(cells, gen, disconnect=False)
+        else:
+            for c in cells:
+                self.sub_generate_cell(c, gen, disconnect=False)
+
+        # The new vertices can hang on the boundaries of the kept cells, the
+        # sub cells also on the boundaries of their parents
+        new_cells = self.H[gen]
+        new = dict((v.index, v) for c in new_cells for v in c()
+                   if v.index > index)
+        new = [new[i] for i in sorted(new)]
+        hanging = dict((v.index, v) for c in cells for v in c.hanging)
+        hanging = [hanging[i] for i in sorted(hanging)] + new
+        self.connect_hanging(new_cells, hanging)
+        self.connect_hanging(kept, new)
+        new_cells.extend(kept)
+
+        # Disconnect the edges of the split cells not used by the new cells
+        lookup = dict((v.index, v) for c in cells
+                      for v in itertools.chain(c(), c.hanging))
+        removed = self.cell_edges(cells)
+        removed = removed[~VertexStore._in_sorted(removed,
+                                                  self.cell_edges(new_cells))]
+        ind = numpy.unique(numpy.concatenate((removed >> 32,
+                                              removed & 0xFFFFFFFF)))
+        self.V.disconnect_graph(
+            [lookup[i] for i in ind.tolist()],
+            (numpy.searchsorted(ind, removed >> 32),
+             numpy.searchsorted(ind, removed & 0xFFFFFFFF)))
+
+    def cell_edges(self, cells):
+        """
+        Returns the sorted distinct keys ``i << 32 | j`` (``i < j``) of the
+        edges of the template graphs of the cells `cells` and of the edges
+        of their hanging vertices, between the vertices of index i and j.
+        """
+        I, J = self.graph_edges
+        ind = numpy.array([[v.index for v in c()] for c in cells],
+                          dtype=numpy.int64).reshape(-1, len(self.template)
+                                                     + 1)
+        pairs = numpy.array([(h.index, v.index) for c in cells
+                             for h, v in c.hanging_edges],
+                            dtype=numpy.int64).reshape(-1, 2)
+        A = numpy.concatenate((ind[:, I].ravel(), pairs[:, 0]))
+        B = numpy.concatenate((ind[:, J].ravel(), pairs[:, 1]))
+        return VertexStore._unique(numpy.minimum(A, B) << 32
+                                   | numpy.maximum(A, B))
+
+    def connect_hanging(self, cells, candidates):
+        """
+        Connects the vertices of `candidates` on the boundaries of the cells
+        `cells` which are not vertices of the cells to the vertices of the
+        simplices of the cells containing them (see boundary_star).
+        """
+        if not cells or not candidates:
+            return
+        P = lattice_points([v.key for v in candidates])
+        K = lattice_points([k for c in cells for k in (c.origin, c.supremum)])
+        O, S = K[0::2], K[1::2]
+        lo, hi = numpy.minimum(O, S), numpy.maximum(O, S)
+
+        # The cells of side length L are the boxes of the dyadic grid with
+        # spacing L, a point is in the boxes of its grid cell and of the
+        # grid cells below it in the coordinates on the grid lines
+        k, j = [], []
+        size = hi[:, 0] - lo[:, 0]
+        for L in numpy.unique(size).tolist():
+            level = numpy.flatnonzero(size == L)
+            boxes = dict(zip(lattice_keys(lo[level]), level.tolist()))
+            base = P - P % L
+            on_grid = (P % L == 0)
+            j_l, t_l = numpy.nonzero(
+                numpy.all(self.template[None] <= on_grid[:, None], axis=2))
+            found = [boxes.get(key) for key in lattice_keys(
+                base[j_l] - L * self.template[t_l])]
+            k.extend(c for c in found if c is not None)
+            j.extend(j_l[[c is not None for c in found]].tolist())
+        k = numpy.array(k, dtype=numpy.int64)
+        j = numpy.array(j, dtype=numpy.int64)
+
+        # Coordinates from the origins towards the suprema, without the
+        # vertices of the cells
+        length = size[k]
+        W = numpy.abs(P[j] - O[k])
+        hanging = ~(numpy.all((W == 0) | (W == length[:, None]), axis=1)
+                    | numpy.all(2 * W == length[:, None], axis=1))
+        k, j = k[hanging], j[hanging]
+        if not len(k):
+            return
+
+        # Connect them with the vertices of their stars and the centroid
+        star = numpy.ones((len(k), len(self.template) + 1), dtype=bool)
+        star[:, :-1] = boundary_star(W[hanging], length[hanging],
+                                     self.template)
+        vertices = list(candidates)
+        I, J = [], []
+        for k_p, j_p, star_p in zip(k.tolist(), j.tolist(), star):
+            C = cells[k_p]
+            h = candidates[j_p]
+            ind = numpy.flatnonzero(star_p)
+            C.hanging.append(h)
+            C.hanging_edges.extend((h, C()[i]) for i in ind)
+            I.append(numpy.full(len(ind), j_p))
+            J.append(len(vertices) + ind)
+            vertices.extend(C())
+        self.V.connect_graph(vertices, (numpy.concatenate(I),
+                                        numpy.concatenate(J)))
+
     def split_generation(self):
         """
         Run sub_generate_cell for every cell in the current complex self.gen
         """
+        if self.gen + 2 > LATTICE_BITS:
+            raise ValueError("The cells of the complex can not be split "
+                             "more than {} times".format(LATTICE_BITS - 2))
+
         no_splits = False  # USED IN SHGO
+        if self.uniform_cells:
+            self.new_cell_vertices = []
         try:
-            for c in self.H[self.gen]:
-                if self.symmetry:
-                    # self.sub_generate_cell_symmetry(c, self.gen + 1)
-                    self.split_simplex_symmetry(c, self.gen + 1)
-                else:
-                    self.sub_generate_cell(c, self.gen + 1)
+            cells = self.H[self.gen]
+            if self.refinement == 'minimisers':
+                # Cells which are not split are carried over to the next
+                # generation
+                self.refine_cells(*self.refined_cells(cells),
+                                  gen=self.gen + 1)
+            elif self.split_workers is not None and not self.symmetry:
+                self.split_cells(cells, self.gen + 1)
+            else:
+                for c in cells:
+                    if self.symmetry:
+                        # self.sub_generate_cell_symmetry(c, self.gen + 1)
+                        self.split_simplex_symmetry(c, self.gen + 1)
+                    else:
+                        self.sub_generate_cell(c, self.gen + 1)
         except IndexError:
             no_splits = True  # USED IN SHGO
 
+        # Evaluate the new vertices of the generation (vectorized or parallel)
+        self.V.process_pools()
+
+        if self.uniform_cells and not no_splits:
+            self.cell_vertices = numpy.fromiter(
+                itertools.chain.from_iterable(self.new_cell_vertices),
+                dtype=numpy.int64).reshape(-1, len(self.template) + 1)
+        self.new_cell_vertices = None
+
         self.gen += 1
         return no_splits  # USED IN SHGO
 
-    # @lru_cache(maxsize=None)
+    def minimisers(self):
+        """
+        Returns the minimisers of the complex in the order of their index.
+
+        In a uniformly split complex of hypercube cells the function values
+        of the vertices of every cell are compared with those of their
+        neighbours in the template graph for all cells at once (see
+        template_minimisers), a vertex on the faces between cells is a
+        minimiser if it is one in every cell containing it. Otherwise the
+        minimisers maintained by the vertex cache are returned.
+        """
+        if self.cell_vertices is None:
+            return self.V.minimisers()
+
+        I = self.cell_vertices.T
+        in_cell = template_minimisers(self.V.F[I], self.graph_edges)
+        is_min = numpy.bincount(I[~in_cell], minlength=len(self.V)) == 0
+        self.V.set_minimisers(is_min)
+        return [self.V.vertices[i] for i in numpy.flatnonzero(is_min)]
+
+    def split_cells(self, cells, gen, disconnect=True):
+        """
+        Subgenerate the cells `cells` into generation `gen` like
+        sub_generate_cell, with the coordinates of the new vertices of
+        chunks of cells computed by the split workers (see
+        sub_generate_cells).
+
+        The chunks are merged in order, shared vertices (on the faces between
+        cells) are found in the vertex cache, so the new vertices, cells and
+        edges are the same as those of sub_generate_cell.
+        """
+        # If not gen append
+        try:
+            self.H[gen]
+        except IndexError:
+            self.H.append([])
+
+        # About 2**20 coordinates of new vertices per chunk
+        n_sub = len(self.template)
+        chunksize = max(1, 2 ** 20 // (n_sub * (n_sub + 1) * self.dim))
+        chunks = [cells[i:i + chunksize]
+                  for i in range(0, len(cells), chunksize)]
+        jobs = []
+        for chunk in chunks:
+            K = lattice_points([v.key for c in chunk for v in c()])
+            K = K.reshape(len(chunk), n_sub + 1, self.dim)
+            jobs.append((self.template, self.graph_edges, K[:, -1],
+                         K[:, :-1]))
+
+        I, J = self.graph_edges
+        results = self.split_workers(sub_generate_cells, jobs)
+        for chunk, (X, inverse, edges) in zip(chunks, results):
+            V_new = [self.V[k] for k in lattice_keys(X)]
+            if self.new_cell_vertices is not None:
+                ind = numpy.array([v.index for v in V_new])
+                self.new_cell_vertices.extend(ind[inverse].tolist())
+            inverse = inverse.tolist()
+            for k, C_i in enumerate(chunk):
+                origin = C_i()[-1].key
+                for l, v in enumerate(C_i()[:-1]):
+                    C_new = Cell(gen, C_i.hg_n, origin, v.key)
+                    C_new.C = [V_new[i] for i in inverse[k * n_sub + l]]
+                    C_new.centroid = C_new.C[-1].key
+                    self.H[gen].append(C_new)
+
+            # Connect the new cells and disconnect the old ones
+            self.V.connect_graph(V_new, edges)
+            if not disconnect:
+                continue
+            offsets = (n_sub + 1) * numpy.arange(len(chunk))[:, None]
+            self.V.disconnect_graph([v for C_i in chunk for v in C_i()],
+                                    ((offsets + I).ravel(),
+                                     (offsets + J).ravel()))
+
     def construct_hypercube(self, origin, supremum, gen, hgr,
                             printout=False):
         """
@@ -347,40 +658,29 @@ class Complex:
 
         Parameters
         ----------
-        origin : vec
-        supremum : vec (tuple)
+        origin : lattice point key
+        supremum : lattice point key
         gen : generation
         hgr : parent homology group rank
         """
 
         # Initiate new cell
         C_new = Cell(gen, hgr, origin, supremum)
-        C_new.centroid = tuple(
-            (numpy.array(origin) + numpy.array(supremum)) / 2.0)
-
-        # Build new indexed vertex list
-        V_new = []
-
-        # Cached calculation
-        for i, v in enumerate(self.C0()[:-1]):
-            t1 = self.generate_sub_cell_t1(origin, v.x)
-            t2 = self.generate_sub_cell_t2(supremum, v.x)
-
-            vec = t1 + t2
-
-            vec = tuple(vec)
-            C_new.add_vertex(self.V[vec])
-            V_new.append(vec)
 
-        # Add new centroid
-        C_new.add_vertex(self.V[C_new.centroid])
-        V_new.append(C_new.centroid)
-
-        # Connect new vertices #TODO: Thread into other loop; no need for V_new
-        for i, connections in enumerate(self.graph):
-            # Present vertex V_new[i]; connect to all connections:
-            for j in connections:
-                self.V[V_new[i]].connect(self.V[V_new[j]])
+        # Vertices of the new cell (the distinct vertices in the order of
+        # the template), from the origin and supremum scaled template of C0,
+        # followed by the new centroid
+        v_o, v_s = lattice_points([origin, supremum])
+        X = numpy.empty((len(self.template) + 1, self.dim), dtype=numpy.int64)
+        X[:-1] = v_o + (v_s - v_o) * self.template
+        X[-1] = v_o + (v_s - v_o) // 2
+        C_new.C = [self.V[k] for k in lattice_keys(X)]
+        C_new.centroid = C_new.C[-1].key
+
+        # Connect new vertices with the edges of the template
+        self.V.connect_graph(C_new(), self.graph_edges)
+        if self.new_cell_vertices is not None:
+            self.new_cell_vertices.append([v.index for v in C_new.C])
 
         if printout:
             print("A sub hyper cube with:")
@@ -415,18 +715,16 @@ class Complex:
             self.H.append([])
 
         # Find new vertex.
-        # V_new_x = tuple((numpy.array(C()[0].x) + numpy.array(C()[1].x)) / 2.0)
         s = S()
-        firstx = s[0].x
-        lastx = s[-1].x
-        V_new = self.V[tuple((numpy.array(firstx) + numpy.array(lastx)) / 2.0)]
+        K = lattice_points([s[0].key, s[-1].key])
+        V_new = self.V[lattice_keys([K[0] + (K[1] - K[0]) // 2])[0]]
 
         # Disconnect old longest edge
-        self.V[firstx].disconnect(self.V[lastx])
+        s[0].disconnect(s[-1])
 
         # Connect new vertices to all other vertices
         for v in s[:]:
-            v.connect(self.V[V_new.x])
+            v.connect(V_new)
 
         # New "lower" simplex
         S_new_l = Simplex(gen, S.hg_n, self.generation_cycle,
@@ -458,39 +756,6 @@ class Complex:
 
         return
 
-    @lru_cache(maxsize=None)
-    def generate_sub_cell_2(self, origin, supremum, v_x_t):  # No hits
-        """
-        Use the origin and supremum vectors to find a new cell in that
-        subspace direction
-
-        NOTE: NOT CURRENTLY IN USE!
-
-        Parameters
-        ----------
-        origin : tuple vector (hashable)
-        supremum : tuple vector (hashable)
-
-        Returns
-        -------
-
-        """
-        t1 = self.generate_sub_cell_t1(origin, v_x_t)
-        t2 = self.generate_sub_cell_t2(supremum, v_x_t)
-        vec = t1 + t2
-        return tuple(vec)
-
-    @lru_cache(maxsize=None)
-    def generate_sub_cell_t1(self, origin, v_x):
-        # TODO: Calc these arrays outside
-        v_o = numpy.array(origin)
-        return v_o - v_o * numpy.array(v_x)
-
-    @lru_cache(maxsize=None)
-    def generate_sub_cell_t2(self, supremum, v_x):
-        v_s = numpy.array(supremum)
-        return v_s * numpy.array(v_x)
-
     # Plots
     def plot_complex(self):
         """
@@ -581,6 +846,338 @@ class Complex:
         return
 
 
+# Subsets of the coordinates by dimension and size (see star_layer)
+_star_layers = {}
+
+
+def star_layer(dim, k):
+    """
+    Returns the subsets of size `k` of the `dim` coordinates in the rows of
+    a matrix of 0 and 1 (int8), cached by dimension and size.
+    """
+    try:
+        return _star_layers[dim, k]
+    except KeyError:
+        pass
+    subsets = numpy.array(list(itertools.combinations(range(dim), k)),
+                          dtype=numpy.int64).reshape(-1, k)
+    S = numpy.zeros((len(subsets), dim), dtype=numpy.int8)
+    S[numpy.arange(len(subsets))[:, None], subsets] = 1
+    _star_layers[dim, k] = S
+    return S
+
+
+class LazyComplex(object):
+    """
+    Freudenthal triangulation of the unit hypercube whose vertices are only
+    generated (and evaluated) when the minimiser search visits them, for
+    problems in which the 2**dim vertices of every hypercube cell of
+    `Complex` are too many.
+
+    The vertices of generation ``gen`` are the points of the grid with
+    spacing ``h = 2**-(gen + 1)``. The simplices containing the vertex ``p``
+    are the chains ``p, p + h e_1, p + h (e_1 + e_2), ...`` over all
+    orderings of the coordinates and the same chains ending in ``p``, so the
+    neighbours of ``p`` are the grid points ``p + h e_S`` and ``p - h e_S``
+    for the non-empty subsets ``S`` of the coordinates (``e_S`` has the
+    coordinates in ``S`` equal to 1). They are found with this index
+    arithmetic on the integer lattice coordinates (see `lattice_keys`)
+    instead of being stored.
+
+    The descents start from the centre of the domain and from `n_seeds`
+    points of the Sobol sequence, moved to the nearest vertices of the grid
+    (every vertex of the coarse grids of the first generations in low
+    dimensions). Every descent moves to the lowest vertex of the first layer
+    of neighbours (subsets of the same size) containing a lower vertex, the
+    descents take their steps together so that the new vertices of a step
+    are evaluated together. A vertex lower than all its neighbours is a
+    minimiser, it is connected to them in the vertex store. Every generation
+    descends again from the minimisers of the previous one, from the
+    starting points of the previous one moved to the finer grid and from
+    `n_seeds` new points, so that the basins missed by the coarser grids can
+    still be found.
+
+    Parameters
+    ----------
+    star_depth : int, optional
+        Only the neighbours ``p +- h e_S`` with subsets ``S`` of at most
+        `star_depth` coordinates are compared with ``p`` (``2 * dim``
+        neighbours for 1, ``dim * (dim + 1)`` for the default 2), which makes
+        a minimiser a local minimum of a coarser neighbourhood. If None all
+        the ``2**(dim + 1) - 2`` neighbours are compared, which is only
+        feasible in low dimensions.
+    n_seeds : int, optional
+        Number of points of the Sobol sequence added to the starting points
+        of the descents by every generation.
+
+    The other parameters are those of `Complex`.
+    """
+
+    def __init__(self, dim, func, func_args=(), bounds=None, g_cons=None,
+                 g_args=(), vectorized=False, workers=None, star_depth=2,
+                 n_seeds=100):
+        self.dim = dim
+        self.bounds = bounds
+        self.star_depth = dim if star_depth is None else min(star_depth, dim)
+        if self.star_depth < 1:
+            raise ValueError("star_depth must be a positive integer")
+        self.V = VertexStore(func, func_args, bounds, g_cons, g_args,
+                             vectorized=vectorized, workers=workers)
+        self.gen = 0
+        # Indexes of the minimisers of the current generation
+        self.minimiser_set = set()
+        # Starting points of the descents of the last generation in the unit
+        # hypercube (see seeds)
+        self.n_seeds = n_seeds
+        self.sampler = SobolStream(dim)
+        self.sample = numpy.full((1, dim), 0.5)
+        self.search(self.seeds())
+
+    @property
+    def step(self):
+        """The grid spacing of the current generation (lattice units)"""
+        return LATTICE_SCALE >> (self.gen + 1)
+
+    def seeds(self):
+        """
+        Returns the indexes of the vertices of the current generation
+        nearest to the starting points of the previous generation and to the
+        next `n_seeds` points of the Sobol sequence
+        """
+        sample = self.sampler.next_batch(self.n_seeds)
+        X = numpy.concatenate((self.sample, sample))
+        self.sample = sample
+        K = numpy.rint(X * 2 ** (self.gen + 1)).astype(numpy.int64)
+        ind = self.V.add_points(K * self.step)
+        self.V.process_pools()
+        return ind.tolist()
+
+    def stars(self, ind, k):
+        """
+        Returns the indexes of the neighbours of the vertices `ind` in the
+        layer of subsets of size `k` (one array per vertex), generated (and
+        evaluated together) when they are new
+        """
+        S = self.step * star_layer(self.dim, k).astype(numpy.int64)
+        S = numpy.concatenate((S, -S))
+        P = lattice_points([self.V.vertices[i].key for i in ind])
+        K = P[:, None, :] + S[None, :, :]
+        inside = numpy.all((K >= 0) & (K <= LATTICE_SCALE), axis=2)
+        nn = self.V.add_points(K[inside])
+        self.V.process_pools()
+        return numpy.split(nn, numpy.cumsum(inside.sum(axis=1))[:-1])
+
+    def search(self, seeds):
+        """
+        Descends from all the vertices `seeds` (indexes) to the minimisers of
+        the current generation. A descent stops without a minimiser at a
+        vertex with a neighbour of the same function value or at a vertex
+        visited by another descent.
+        """
+        visited = set()
+        layers = {}  # Index of the vertex of a descent --> size of subsets
+        stars = {}  # Index of the vertex of a descent --> compared layers
+        for i in seeds:
+            if i not in visited:
+                visited.add(i)
+                layers[i] = 1
+                stars[i] = []
+
+        while layers:
+            steps = []
+            for k in sorted(set(layers.values())):
+                ind = sorted(i for i in layers if layers[i] == k)
+                for i, nn in zip(ind, self.stars(ind, k)):
+                    F = self.V.F  # The arrays grow with new vertices
+                    stars[i].append(nn)
+                    if len(nn) and not numpy.all(F[i] < F[nn]):
+                        # Step to the lowest vertex of the layer
+                        del layers[i]
+                        del stars[i]
+                        j = int(nn[numpy.argmin(F[nn])])
+                        if F[j] < F[i]:
+                            steps.append(j)
+                    elif k < self.star_depth:
+                        layers[i] = k + 1
+                    else:
+                        # Lower than every neighbour
+                        self.V.connect_all(i, numpy.concatenate(stars[i]))
+                        self.minimiser_set.add(i)
+                        del layers[i]
+                        del stars[i]
+
+            for j in steps:
+                if j not in visited:
+                    visited.add(j)
+                    layers[j] = 1
+                    stars[j] = []
+
+    def split_generation(self):
+        """
+        Refines the grid and searches for the minimisers of the new
+        generation starting from those of the previous one and from the
+        sampled starting points (see seeds)
+        """
+        if self.gen + 2 > LATTICE_BITS:
+            raise ValueError("The cells of the complex can not be split "
+                             "more than {} times".format(LATTICE_BITS - 2))
+
+        seeds = sorted(self.minimiser_set)
+        for i in seeds:
+            self.V.disconnect_all(i, self.V.neighbours(i))
+        self.minimiser_set = set()
+        self.gen += 1
+        self.search(seeds + self.seeds())
+        return False
+
+    def minimisers(self):
+        """
+        Returns the minimisers of the current generation in the order of
+        their index
+        """
+        return [self.V.vertices[i] for i in sorted(self.minimiser_set)]
+
+
+def boundary_star(W, length, template):
+    """
+    Returns the flags of the vertices of the triangulation of cells which
+    are vertices of the simplices containing points on their boundaries.
+
+    The simplices of the triangulation of the hypercube (see cube_template)
+    are the chains of sets of coordinates from the origin to the supremum,
+    the minimal simplex containing a point ``w`` is the chain of the sets of
+    the coordinates ``w_i >= a`` for the positive values ``a`` of ``w`` (and
+    the origin if ``w < length``). A vertex is in a chain through these
+    sets if its coordinates equal to 1 are those of the largest ``w_i``.
+    The edge between the origin and the supremum is split by the centroid
+    of the cell, so they are never in the same simplex.
+
+    Parameters
+    ----------
+    W : array
+        Integer coordinates of the points (rows) from the origins of their
+        cells towards the suprema, from 0 to `length`, at least one of them
+        equal to 0 or `length` in every row.
+    length : array
+        Side lengths of the cells.
+    template : array
+        The 0 and 1 coordinates of the vertices of the triangulation
+        (without the centroid) in the rows of a matrix.
+
+    Returns
+    -------
+    star : array
+        ``star[k, t]`` is True if the vertex ``template[t]`` of the cell of
+        the point ``W[k]`` is a vertex of a simplex containing it.
+    """
+    ones = template.astype(bool)
+    W = W[:, None, :]
+    # Smallest coordinate in the set of the vertex, largest one outside it
+    w_in = numpy.where(ones, W, numpy.iinfo(numpy.int64).max).min(axis=2)
+    w_out = numpy.where(ones, -1, W).max(axis=2)
+    star = w_in >= w_out
+    star[W.max(axis=2)[:, 0] < length, :] &= ~ones.all(axis=1)
+    star[W.min(axis=2)[:, 0] > 0, :] &= ones.any(axis=1)
+    return star
+
+
+def template_minimisers(F, edges):
+    """
+    Returns the minimiser flags of the vertices of cells with the same
+    template graph.
+
+    Parameters
+    ----------
+    F : array
+        ``F[k, c]`` is the function value of the ``k``-th vertex (in the
+        order of the template) of the cell ``c``.
+    edges : tuple
+        Index arrays ``I, J`` of the edges of the template graph.
+
+    Returns
+    -------
+    in_cell : array
+        ``in_cell[k, c]`` is True if the ``k``-th vertex of the cell ``c`` is
+        strictly less than all its neighbours in the cell.
+    """
+    # Smallest function value of the neighbours of every vertex, one array
+    # operation over all cells per edge of the template
+    F_nn = numpy.full(F.shape, numpy.inf)
+    for i, j in zip(*edges):
+        numpy.minimum(F_nn[i], F[j], out=F_nn[i])
+        numpy.minimum(F_nn[j], F[i], out=F_nn[j])
+    return F < F_nn
+
+
+def sub_generate_cells(job):
+    """
+    Returns the vertices of the sub cells of a chunk of cells (used by
+    Complex.split_cells in worker processes).
+
+    Parameters
+    ----------
+    job : tuple
+        ``(template, edges, origins, corners)``, the vertices of the
+        initial cell without the centroid (``(2**n, n)`` array of 0 and 1),
+        the edges of its graph (index arrays ``I, J``) and the integer
+        lattice coordinates of the centroids (``(m, n)``) and corners
+        (``(m, 2**n, n)``) of the ``m`` cells.
+
+    Returns
+    -------
+    X : array
+        The integer lattice coordinates of the distinct vertices of the sub
+        cells, in the order they first appear in the cells.
+    inverse : array
+        ``X[inverse[k]]`` are the vertices of the ``k``-th sub cell
+        (``2**n`` sub cells per cell, one for every corner), the last one is
+        the centroid of the sub cell.
+    edges : tuple
+        Index arrays ``I, J`` of the distinct edges ``X[I[k]], X[J[k]]`` of
+        the sub cells.
+    """
+    template, edges, origins, corners = job
+    v_o = origins[:, None, None, :]
+    v_s = corners[:, :, None, :]
+    # The same arithmetic as construct_hypercube
+    X = numpy.concatenate((v_o + (v_s - v_o) * template,
+                           v_o + (v_s - v_o) // 2), axis=2)
+    n_vertices = X.shape[2]
+    X = X.reshape(-1, X.shape[-1])
+
+    # Sort the vertices by a hash of their coordinates to find the distinct
+    # ones (equal hashes of different vertices at most leave duplicates,
+    # which are merged by the vertex cache)
+    bits = X.view(numpy.uint64)
+    h = numpy.zeros(len(bits), dtype=numpy.uint64)
+    for k in range(bits.shape[1]):
+        # Fold the high bits (the low bits of the coordinates are 0) and mix
+        h = (h ^ bits[:, k] ^ (bits[:, k] >> numpy.uint64(32))) * \
+            numpy.uint64(0x9E3779B97F4A7C15)
+        h ^= h >> numpy.uint64(29)
+    order = numpy.argsort(h)
+    new = numpy.ones(len(order), dtype=bool)
+    new[1:] = ((h[order[1:]] != h[order[:-1]])
+               | (bits[order[1:]] != bits[order[:-1]]).any(axis=1))
+    starts = numpy.flatnonzero(new)
+    first = numpy.minimum.reduceat(order, starts)
+
+    # Number the distinct vertices in the order of their first appearance
+    rank = numpy.empty(len(first), dtype=int)
+    rank[numpy.argsort(first)] = numpy.arange(len(first))
+    inverse = numpy.empty(len(order), dtype=int)
+    inverse[order] = rank[numpy.cumsum(new) - 1]
+    inverse = inverse.reshape(-1, n_vertices)
+    X = X[numpy.sort(first)]
+
+    # Distinct edges of the sub cells
+    I, J = edges
+    I, J = inverse[:, I].ravel(), inverse[:, J].ravel()
+    keys = numpy.sort(numpy.minimum(I, J) * len(X) + numpy.maximum(I, J))
+    keys = keys[numpy.concatenate(([True], keys[1:] != keys[:-1]))]
+    return X, inverse, (keys // len(X), keys % len(X))
+
+
 class VertexGroup(object):
     def __init__(self, p_gen, p_hgr):
         self.p_gen = p_gen  # parent generation
@@ -642,9 +1239,15 @@ class Cell(VertexGroup):
     def __init__(self, p_gen, p_hgr, origin, supremum):
         super(Cell, self).__init__(p_gen, p_hgr)
 
+        # Lattice point keys (see lattice_keys)
         self.origin = origin
         self.supremum = supremum
         self.centroid = None  # (Not always used)
+        # Vertices on the boundary which are not vertices of the cell and
+        # their edges to the vertices of the cell (see
+        # Complex.connect_hanging)
+        self.hanging = []
+        self.hanging_edges = []
         # TODO: self.bounds
 
 
@@ -661,12 +1264,12 @@ class Simplex(VertexGroup):
 
 
 class Vertex:
-    def __init__(self, x, bounds=None, func=None, func_args=(), g_cons=None,
-                 g_cons_args=(), nn=None, index=None):
+    def __init__(self, key, bounds=None, func=None, func_args=(),
+                 g_cons=None, g_cons_args=(), nn=None, index=None,
+                 dirty=None):
         import numpy
-        self.x = x
-        self.order = sum(x)
-        x_a = numpy.array(x, dtype=float)
+        self.key = key  # Lattice point (see lattice_keys)
+        x_a = numpy.array(self.x, dtype=float)
         if bounds is not None:
             for i, (lb, ub) in enumerate(bounds):
                 x_a[i] = x_a[i] * (ub - lb) + lb
@@ -694,26 +1297,33 @@ class Vertex:
 
         self.fval = None
         self.check_min = True
+        # Set of the changed vertices of the cache (see VertexCache.dirty)
+        self.dirty = dirty
 
         # Index:
         if index is not None:
             self.index = index
 
     def __hash__(self):
-        return hash(self.x)
+        return hash(self.key)
+
+    @property
+    def x(self):
+        return lattice_coordinates(self.key)
+
+    @property
+    def order(self):
+        return sum(self.x)
 
     def connect(self, v):
         if v is not self and v not in self.nn:
             self.nn.add(v)
             v.nn.add(self)
 
-            if self.minimiser():
-                v._min = False
-                v.check_min = False
-
-            # TEMPORARY
             self.check_min = True
             v.check_min = True
+            if self.dirty is not None:
+                self.dirty.update((self, v))
 
     def disconnect(self, v):
         if v in self.nn:
@@ -721,6 +1331,16 @@ class Vertex:
             v.nn.remove(self)
             self.check_min = True
             v.check_min = True
+            if self.dirty is not None:
+                self.dirty.update((self, v))
+
+    def connect_all(self, vertices):
+        for v in vertices:
+            self.connect(v)
+
+    def disconnect_all(self, vertices):
+        for v in vertices:
+            self.disconnect(v)
 
     def minimiser(self):
         """Check whether this vertex is strictly less than all its neighbours"""
@@ -742,7 +1362,8 @@ class Vertex:
 
 class VertexCache:
     def __init__(self, func, func_args=(), bounds=None, g_cons=None,
-                 g_cons_args=(), indexed=True):
+                 g_cons_args=(), indexed=True, vectorized=False,
+                 workers=None):
 
         self.cache = {}
         self.func = func
@@ -752,33 +1373,61 @@ class VertexCache:
         self.bounds = bounds
         self.nfev = 0
         self.size = 0
+        # In vectorized mode, or with parallel workers (a
+        # shgo.shgo_m.parallel.MapWrapper), new vertices are stored in a pool
+        # and evaluated together by process_pools
+        self.vectorized = vectorized
+        self.workers = workers
+        self.deferred = vectorized or (workers is not None and
+                                       not workers.serial)
+        self.fpool = []
+        # The vertices changed (new, evaluated or (dis)connected) since the
+        # last call of minimisers and the set of minimisers it maintains
+        self.dirty = set()
+        self.minimiser_set = set()
 
         if indexed:
             self.index = -1
 
     def __getitem__(self, x, indexed=True):
+        """
+        Returns the vertex at the lattice point `x` (a key of the cache) or
+        at the coordinates `x` (tuple) of the unit hypercube
+        """
+        if not isinstance(x, bytes):
+            x = lattice_key(x)
         try:
             return self.cache[x]
         except KeyError:
+            if self.deferred:
+                func = None  # Evaluated later in process_pools
+            else:
+                func = self.func
+
             if indexed:
                 self.index += 1
                 xval = Vertex(x, bounds=self.bounds,
-                              func=self.func, func_args=self.func_args,
+                              func=func, func_args=self.func_args,
                               g_cons=self.g_cons,
                               g_cons_args=self.g_cons_args,
-                              index=self.index)
+                              index=self.index, dirty=self.dirty)
             else:
                 xval = Vertex(x, bounds=self.bounds,
-                              func=self.func, func_args=self.func_args,
+                              func=func, func_args=self.func_args,
                               g_cons=self.g_cons,
-                              g_cons_args=self.g_cons_args)
+                              g_cons_args=self.g_cons_args,
+                              dirty=self.dirty)
+            self.dirty.add(xval)
 
             # logging.info("New generated vertex at x = {}".format(x))
             # NOTE: Surprisingly high performance increase if logging is commented out
             self.cache[x] = xval
 
             # TODO: Check
-            if self.func is not None:
+            if self.deferred:
+                self.fpool.append(xval)
+                self.size += 1
+            elif self.func is not None:
                 if self.g_cons is not None:
                     if xval.feasible:
                         self.nfev += 1
@@ -790,3 +1439,517 @@ class VertexCache:
                     self.size += 1
 
             return self.cache[x]
+
+    def connect_graph(self, vertices, edges):
+        """
+        Connects ``vertices[I[k]]`` and ``vertices[J[k]]`` for the index
+        arrays ``I, J = edges`` of a template graph
+        """
+        for i, j in zip(*edges):
+            vertices[i].connect(vertices[j])
+
+    def disconnect_graph(self, vertices, edges):
+        """
+        Disconnects ``vertices[I[k]]`` and ``vertices[J[k]]`` for the index
+        arrays ``I, J = edges`` of a template graph
+        """
+        for i, j in zip(*edges):
+            vertices[i].disconnect(vertices[j])
+
+    def process_pools(self):
+        """
+        Evaluate the constraints and the objective function of all vertices
+        in the pool. In vectorized mode with one call per function, the
+        coordinates of the vertices are passed as an array of shape
+        ``(dim, N)``, otherwise the vertices are divided among the workers
+        """
+        if not self.fpool:
+            return
+
+        if self.vectorized:
+            X = numpy.array([v.x_a for v in self.fpool])
+            feasible = numpy.ones(len(self.fpool), dtype=bool)
+            if self.g_cons is not None:
+                for g, args in zip(self.g_cons, self.g_cons_args):
+                    feasible &= numpy.asarray(g(X.T, *args)) >= 0.0
+
+            F = numpy.full(len(self.fpool), numpy.inf)
+            if numpy.any(feasible):
+                F[feasible] = self.func(X[feasible].T, *self.func_args)
+        else:
+            evaluate = SampleEvaluator(self.func, self.func_args,
+                                       self.g_cons, self.g_cons_args)
+            F = evaluate_points(self.workers, evaluate,
+                                [v.x_a for v in self.fpool])
+            feasible = numpy.array([f is not None for f in F], dtype=bool)
+            F = [numpy.inf if f is None else f for f in F]
+
+        for v, f, feas in zip(self.fpool, F, feasible):
+            v.f = f
+            v.feasible = feas
+            v.check_min = True
+        self.dirty.update(self.fpool)
+
+        self.nfev += numpy.count_nonzero(feasible)
+        self.fpool = []
+
+    def minimisers(self):
+        """
+        Returns the minimisers of the complex in the order of their index.
+        Only the vertices changed since the last call are checked.
+        """
+        for v in self.dirty:
+            if v.minimiser():
+                self.minimiser_set.add(v)
+            else:
+                self.minimiser_set.discard(v)
+        self.dirty.clear()  # The vertices keep a reference to the set
+
+        return sorted(self.minimiser_set, key=lambda v: v.index)
+
+
+class VertexView(object):
+    """
+    Handle of the vertex `index` of a `VertexStore` with the interface of a
+    `Vertex`, its data is stored in the arrays of the store.
+    """
+    __slots__ = ('store', 'index', 'key')
+
+    def __init__(self, store, index, key):
+        self.store = store
+        self.index = index
+        self.key = key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    @property
+    def x(self):
+        return lattice_coordinates(self.key)
+
+    @property
+    def x_a(self):
+        return self.store.X_a[self.index].copy()
+
+    @property
+    def f(self):
+        return self.store.F[self.index]
+
+    @property
+    def feasible(self):
+        return bool(self.store.feasible[self.index])
+
+    @property
+    def order(self):
+        return sum(self.x)
+
+    @property
+    def nn(self):
+        vertices = self.store.vertices
+        return set(vertices[j] for j in self.store.neighbours(self.index))
+
+    @property
+    def check_min(self):
+        return bool(self.store.check_min[self.index])
+
+    def connect(self, v):
+        self.store.connect(self.index, v.index)
+
+    def disconnect(self, v):
+        self.store.disconnect(self.index, v.index)
+
+    def connect_all(self, vertices):
+        self.store.connect_all(self.index, [v.index for v in vertices])
+
+    def disconnect_all(self, vertices):
+        self.store.disconnect_all(self.index, [v.index for v in vertices])
+
+    def minimiser(self):
+        """Check whether this vertex is strictly less than all its neighbours"""
+        return self.store.minimiser(self.index)
+
+    def print_out(self):
+        print("Vertex: {}".format(self.x))
+        constr = 'Connections: '
+        for vc in self.nn:
+            constr += '{} '.format(vc.x)
+
+        print(constr)
+        print('Order = {}'.format(self.order))
+
+
+class VertexStore(object):
+    """
+    Struct-of-arrays storage of the vertices of a simplicial complex with the
+    interface of `VertexCache`.
+
+    The scaled coordinates, function values, feasibility and minimiser flags
+    of the vertices are rows of arrays that grow by doubling. The edges of
+    the complex are a sorted array of the keys ``i << 32 | j`` of both
+    directions of every edge, so that the neighbours of vertex ``i`` are a
+    contiguous slice (a compressed sparse row adjacency without the explicit
+    row pointers). Connections and disconnections are logged and merged into
+    the edge array together when the neighbours are needed, once per
+    generation of the complex. ``store[x]`` returns the `VertexView` of the
+    vertex at the lattice point ``x`` (or at the coordinate tuple ``x``, see
+    `VertexCache`), created (and evaluated) when it is first accessed.
+    """
+
+    def __init__(self, func, func_args=(), bounds=None, g_cons=None,
+                 g_cons_args=(), indexed=True, vectorized=False,
+                 workers=None, capacity=1024):
+        self.cache = {}  # Lattice point key --> VertexView
+        self.vertices = []  # Index --> VertexView
+        self.func = func
+        self.g_cons = g_cons
+        self.g_cons_args = g_cons_args
+        self.func_args = func_args
+        self.bounds = bounds
+        self.nfev = 0
+        self.size = 0
+        # See VertexCache
+        self.vectorized = vectorized
+        self.workers = workers
+        self.deferred = vectorized or (workers is not None and
+                                       not workers.serial)
+        self.fpool = []  # Indexes of the vertices to be evaluated
+
+        self.index = -1
+        self.capacity = capacity
+        self.X_a = None  # Allocated with the first vertex
+        self.edges = numpy.zeros(0, dtype=numpy.int64)
+        self.edge_log = []  # (keys, connect) pairs not merged into edges
+        self.edge_log_size = 0
+        # Index arrays of the vertices changed since the last call of
+        # minimisers (the vertices from checked_size on are all new) and the
+        # set of the indexes of the minimisers it maintains
+        self.dirty = []
+        self.dirty_size = 0
+        self.checked_size = 0
+        self.minimiser_set = set()
+
+    def _allocate(self, dim):
+        """Allocates the arrays for vertices of dimension `dim`"""
+        self.X_a = numpy.empty((self.capacity, dim))
+        self.F = numpy.full(self.capacity, numpy.inf)
+        self.feasible = numpy.ones(self.capacity, dtype=bool)
+        self.check_min = numpy.ones(self.capacity, dtype=bool)
+        self.is_min = numpy.zeros(self.capacity, dtype=bool)
+        if self.bounds is not None:
+            self.lb = numpy.array([lb for lb, ub in self.bounds], dtype=float)
+            self.scale = numpy.array([ub - lb for lb, ub in self.bounds],
+                                     dtype=float)
+
+    def _grow(self):
+        """Doubles the number of vertices that can be stored"""
+        self.capacity *= 2
+        for name in ('X_a', 'F', 'feasible', 'check_min', 'is_min'):
+            old = getattr(self, name)
+            new = numpy.empty((self.capacity,) + old.shape[1:],
+                              dtype=old.dtype)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+
+    def __len__(self):
+        return self.index + 1
+
+    def __getitem__(self, x, indexed=True):
+        if not isinstance(x, bytes):
+            x = lattice_key(x)
+        try:
+            return self.cache[x]
+        except KeyError:
+            pass
+
+        x_a = numpy.frombuffer(x, dtype=numpy.int64) / float(LATTICE_SCALE)
+        if self.X_a is None:
+            self._allocate(len(x_a))
+        self.index += 1
+        i = self.index
+        if i == self.capacity:
+            self._grow()
+
+        if self.bounds is not None:
+            x_a = x_a * self.scale + self.lb
+        self.X_a[i] = x_a
+        self.F[i] = numpy.inf
+        self.feasible[i] = True
+        self.check_min[i] = True
+        self.is_min[i] = False
+
+        if self.deferred:  # Evaluated later in process_pools
+            self.fpool.append(i)
+        elif self.func is not None:
+            self._evaluate(i, x_a)
+        self.size += 1
+
+        v = VertexView(self, i, x)
+        self.cache[x] = v
+        self.vertices.append(v)
+        return v
+
+    def _evaluate(self, i, x_a):
+        """Evaluates the constraints and the function at vertex `i`"""
+        if self.g_cons is not None:
+            for g, args in zip(self.g_cons, self.g_cons_args):
+                if g(x_a, *args) < 0.0:
+                    self.feasible[i] = False
+                    return
+        # Scalar functions of 1D vertices may return shape (1,)
+        self.F[i] = numpy.squeeze(self.func(x_a, *self.func_args))
+        self.nfev += 1
+
+    def add_points(self, K):
+        """
+        Returns the indexes of the vertices at the lattice points with the
+        integer coordinates in the rows of `K` (see `lattice_keys`). The new
+        vertices are added to the arrays together, in the order of their
+        first row.
+        """
+        keys = lattice_keys(K)
+        new = []
+        seen = set()
+        for k in keys:
+            if k not in self.cache and k not in seen:
+                seen.add(k)
+                new.append(k)
+
+        if new:
+            X_a = lattice_points(new) / float(LATTICE_SCALE)
+            if self.X_a is None:
+                self._allocate(X_a.shape[1])
+            while self.index + len(new) >= self.capacity:
+                self._grow()
+            ind = numpy.arange(self.index + 1, self.index + len(new) + 1)
+            if self.bounds is not None:
+                X_a = X_a * self.scale + self.lb
+            self.X_a[ind] = X_a
+            self.F[ind] = numpy.inf
+            self.feasible[ind] = True
+            self.check_min[ind] = True
+            self.is_min[ind] = False
+            self.index += len(new)
+            self.size += len(new)
+
+            for i, k, x_a in zip(ind.tolist(), new, X_a):
+                v = VertexView(self, i, k)
+                self.cache[k] = v
+                self.vertices.append(v)
+                if self.deferred:  # Evaluated later in process_pools
+                    self.fpool.append(i)
+                elif self.func is not None:
+                    self._evaluate(i, x_a)
+
+        return numpy.array([self.cache[k].index for k in keys],
+                           dtype=numpy.int64)
+
+    @staticmethod
+    def _keys(I, J):
+        """Keys of both directions of the edges between `I` and `J`"""
+        I = numpy.asarray(I, dtype=numpy.int64)
+        J = numpy.asarray(J, dtype=numpy.int64)
+        I, J = I[I != J], J[I != J]
+        return numpy.concatenate((I << 32 | J, J << 32 | I))
+
+    @staticmethod
+    def _unique(keys):
+        """Sorted distinct keys (sorting is faster than numpy.unique here)"""
+        keys = numpy.sort(keys)
+        return keys[numpy.concatenate((keys[:1] == keys[:1],
+                                       keys[1:] != keys[:-1]))]
+
+    @staticmethod
+    def _in_sorted(a, b):
+        """Mask of the elements of `a` in the sorted array `b`"""
+        pos = numpy.minimum(numpy.searchsorted(b, a), max(len(b) - 1, 0))
+        return (b[pos] == a) if len(b) else numpy.zeros(len(a), dtype=bool)
+
+    def _merge_edges(self):
+        """Applies the logged connections and disconnections to the edges"""
+        if not self.edge_log:
+            return
+        log = self.edge_log
+        self.edge_log = []
+        self.edge_log_size = 0
+
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        on = self._unique(numpy.concatenate([empty] + [k for k, c in log
+                                                       if c]))
+        off = self._unique(numpy.concatenate([empty] + [k for k, c in log
+                                                        if not c]))
+        # The last logged operation applies to edges in both
+        both = on[self._in_sorted(on, off)]
+        if len(both):
+            last = numpy.zeros(len(both), dtype=bool)
+            for k, c in log:
+                k = k[self._in_sorted(k, both)]
+                last[numpy.searchsorted(both, k)] = c
+            on = on[~self._in_sorted(on, both[~last])]
+            off = off[~self._in_sorted(off, both[last])]
+
+        edges = self.edges[~self._in_sorted(self.edges, off)]
+        new = on[~self._in_sorted(on, edges)]
+        self.edges = numpy.insert(edges, numpy.searchsorted(edges, new), new)
+
+    def neighbours(self, i):
+        """Indexes of the neighbours of vertex `i`"""
+        self._merge_edges()
+        lo, hi = numpy.searchsorted(self.edges, [i << 32, (i + 1) << 32])
+        return self.edges[lo:hi] & 0xFFFFFFFF
+
+    def _log_edges(self, I, J, connect):
+        keys = self._keys(I, J)
+        self.edge_log.append((keys, connect))
+        self.edge_log_size += len(keys)
+        self._changed(I)
+        self._changed(J)
+        # Merge when the log is as long as the edge array to bound its memory
+        if self.edge_log_size > max(len(self.edges), 2 ** 16):
+            self._merge_edges()
+
+    def _changed(self, ind):
+        """Marks the vertices `ind` to be checked again by minimisers"""
+        ind = numpy.asarray(ind, dtype=numpy.int64)
+        self.check_min[ind] = True
+        self.dirty.append(ind)
+        self.dirty_size += len(ind)
+        # Remove the duplicates when there are more than vertices
+        if self.dirty_size > max(2 * len(self), 2 ** 16):
+            self.dirty = [self._unique(numpy.concatenate(self.dirty))]
+            self.dirty_size = len(self.dirty[0])
+
+    def connect_edges(self, I, J):
+        """Connects the vertices `I[k]` and `J[k]` for every k"""
+        self._log_edges(I, J, True)
+
+    def disconnect_edges(self, I, J):
+        """Disconnects the vertices `I[k]` and `J[k]` for every k"""
+        self._log_edges(I, J, False)
+
+    def connect(self, i, j):
+        """Connects the vertices `i` and `j`"""
+        self.connect_edges([i], [j])
+
+    def disconnect(self, i, j):
+        """Disconnects the vertices `i` and `j`"""
+        self.disconnect_edges([i], [j])
+
+    def connect_all(self, i, js):
+        """Connects vertex `i` to all the vertices `js`"""
+        self.connect_edges(numpy.full(len(js), i), js)
+
+    def disconnect_all(self, i, js):
+        """Disconnects vertex `i` from all the vertices `js`"""
+        self.disconnect_edges(numpy.full(len(js), i), js)
+
+    def connect_graph(self, vertices, edges):
+        """
+        Connects ``vertices[I[k]]`` and ``vertices[J[k]]`` for the index
+        arrays ``I, J = edges`` of a template graph
+        """
+        ind = numpy.array([v.index for v in vertices])
+        self.connect_edges(ind[edges[0]], ind[edges[1]])
+
+    def disconnect_graph(self, vertices, edges):
+        """
+        Disconnects ``vertices[I[k]]`` and ``vertices[J[k]]`` for the index
+        arrays ``I, J = edges`` of a template graph
+        """
+        ind = numpy.array([v.index for v in vertices])
+        self.disconnect_edges(ind[edges[0]], ind[edges[1]])
+
+    def minimiser(self, i):
+        """
+        Check whether vertex `i` is strictly less than all its neighbours
+        """
+        if self.check_min[i]:
+            is_min = bool(numpy.all(self.F[i] < self.F[self.neighbours(i)]))
+            if is_min:
+                self.minimiser_set.add(i)
+            else:
+                self.minimiser_set.discard(i)
+            self.is_min[i] = is_min
+            self.check_min[i] = False
+
+        return bool(self.is_min[i])
+
+    def set_minimisers(self, is_min):
+        """
+        Sets the minimiser flags of all vertices to the boolean array
+        `is_min` found with the edges of the complex (Complex.minimisers).
+        """
+        self.is_min[:len(self)] = is_min
+        self.check_min[:len(self)] = False
+        self.minimiser_set = set(numpy.flatnonzero(is_min).tolist())
+        self.dirty = []
+        self.dirty_size = 0
+        self.checked_size = len(self)
+
+    def minimisers(self):
+        """
+        Returns the views of the minimisers of the complex in the order of
+        their index. Only the vertices changed since the last call are
+        checked, together with one array operation.
+        """
+        ind = self._unique(numpy.concatenate(
+            self.dirty + [numpy.arange(self.checked_size, len(self))]))
+        self.dirty = []
+        self.dirty_size = 0
+        self.checked_size = len(self)
+        ind = ind[self.check_min[ind]]
+
+        # Compare the function value of every vertex with the smallest value
+        # of its neighbours, the slices of the edge array
+        self._merge_edges()
+        lo = numpy.searchsorted(self.edges, ind << 32)
+        n = numpy.searchsorted(self.edges, (ind + 1) << 32) - lo
+        start = numpy.cumsum(n) - n
+        pos = numpy.arange(n.sum()) + numpy.repeat(lo - start, n)
+        F_nn = self.F[self.edges[pos] & 0xFFFFFFFF]
+        is_min = numpy.ones(len(ind), dtype=bool)  # Vertices without edges
+        has_nn = n > 0
+        if numpy.any(has_nn):
+            is_min[has_nn] = (self.F[ind[has_nn]]
+                              < numpy.minimum.reduceat(F_nn, start[has_nn]))
+
+        # Update the minimiser set with the changed minimiser flags
+        self.minimiser_set.update(ind[is_min & ~self.is_min[ind]].tolist())
+        self.minimiser_set.difference_update(
+            ind[~is_min & self.is_min[ind]].tolist())
+        self.is_min[ind] = is_min
+        self.check_min[ind] = False
+
+        return [self.vertices[i] for i in sorted(self.minimiser_set)]
+
+    def process_pools(self):
+        """
+        Evaluate the constraints and the objective function of all vertices
+        in the pool (see `VertexCache.process_pools`)
+        """
+        if not self.fpool:
+            return
+
+        ind = numpy.array(self.fpool)
+        X = self.X_a[ind]
+        if self.vectorized:
+            feasible = numpy.ones(len(ind), dtype=bool)
+            if self.g_cons is not None:
+                for g, args in zip(self.g_cons, self.g_cons_args):
+                    feasible &= numpy.asarray(g(X.T, *args)) >= 0.0
+
+            F = numpy.full(len(ind), numpy.inf)
+            if numpy.any(feasible):
+                F[feasible] = self.func(X[feasible].T, *self.func_args)
+        else:
+            evaluate = SampleEvaluator(self.func, self.func_args,
+                                       self.g_cons, self.g_cons_args)
+            F = evaluate_points(self.workers, evaluate, list(X))
+            feasible = numpy.array([f is not None for f in F], dtype=bool)
+            F = [numpy.inf if f is None else numpy.squeeze(f) for f in F]
+
+        self.F[ind] = F
+        self.feasible[ind] = feasible
+        self._changed(ind)
+
+        self.nfev += numpy.count_nonzero(feasible)
+        self.fpool = []
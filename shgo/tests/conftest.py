@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# Coroutine syntax of the asynchronous interface needs Python 3.5+
+collect_ignore = ['test__ashgo.py'] if sys.version_info < (3, 5) else []
+
+
+@pytest.fixture(autouse=True, scope='session')
+def sobol_cache_dir(tmpdir_factory):
+    """Build the Sobol direction number table in a temporary directory
+    instead of the user cache directory"""
+    old = os.environ.get('SHGO_CACHE_DIR')
+    os.environ['SHGO_CACHE_DIR'] = str(tmpdir_factory.mktemp('shgo_cache'))
+    yield
+    if old is None:
+        del os.environ['SHGO_CACHE_DIR']
+    else:
+        os.environ['SHGO_CACHE_DIR'] = old
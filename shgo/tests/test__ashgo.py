@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import numpy
+from pytest import raises as assert_raises
+from shgo._shgo import shgo
+from shgo import ashgo
+
+from .test__shgo import test1_1, test3_1
+
+
+class StructAsyncFunction(object):
+    """Counts the evaluations of an objective function in flight"""
+
+    def __init__(self, f):
+        self.f = f
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, x):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return self.f(x)
+
+
+def run_async_test(test, concurrency, **kwargs):
+    func = StructAsyncFunction(test.f)
+    loop = asyncio.new_event_loop()
+    try:
+        res = loop.run_until_complete(
+            ashgo(func, test.bounds, constraints=test.cons,
+                  concurrency=concurrency, **kwargs))
+    finally:
+        loop.close()
+
+    res_ref = shgo(test.f, test.bounds, constraints=test.cons, **kwargs)
+    numpy.testing.assert_allclose(res.x, res_ref.x)
+    numpy.testing.assert_equal(res.nfev, res_ref.nfev)
+    return func
+
+
+class TestAshgo(object):
+    def test_1_simplicial(self):
+        """Concurrent vertex evaluations of the simplicial complex"""
+        func = run_async_test(test3_1, iters=3, concurrency=4)
+        assert 1 < func.max_in_flight <= 4
+
+    def test_2_sobol(self):
+        """Concurrent sampling point evaluations and local minimisations"""
+        func = run_async_test(test1_1, n=50, iters=2,
+                              sampling_method='sobol', concurrency=4)
+        assert 1 < func.max_in_flight <= 4
+
+    def test_3_cancel(self):
+        """Cancelling ashgo or timing out returns control to the loop"""
+        async def slow(x):
+            await asyncio.sleep(0.05)
+            return test3_1.f(x)
+
+        async def cancel():
+            task = asyncio.ensure_future(
+                ashgo(slow, test3_1.bounds, constraints=test3_1.cons,
+                      iters=6, concurrency=2))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with assert_raises(asyncio.CancelledError):
+                await task
+
+            with assert_raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    ashgo(slow, test3_1.bounds, constraints=test3_1.cons,
+                          iters=6, concurrency=2), 0.3)
+
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(cancel())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                loop.close()
+
+        # A blocked loop can not time out itself
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(30)
+        assert not thread.is_alive()
+        numpy.testing.assert_equal(errors, [])
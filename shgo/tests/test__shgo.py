@@ -1,9 +1,14 @@
+import itertools
 import logging
+import os
+
 import numpy
 import pytest
 from pytest import raises as assert_raises, warns
 from shgo._shgo import shgo
 from shgo._shgo import SHGO
+from shgo.shgo_m import (evaluation_store, sample_store, samplers, sobol_seq,
+                         triangulation)
 
 
 class StructTestFunction(object):
@@ -645,6 +650,702 @@ class TestShgoArguments(object):
         run_test(test1_1, n=1, iters=7, options=options,
                  sampling_method='sobol')
 
+    def test_16_workers(self):
+        """Parallel sampling gives the same evaluations in the same order"""
+        res_ref = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                       n=60, iters=3, sampling_method='sobol')
+        for workers in [2, map]:
+            res = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                       n=60, iters=3, sampling_method='sobol',
+                       workers=workers)
+            numpy.testing.assert_allclose(res.x, res_ref.x)
+            numpy.testing.assert_equal(res.nfev, res_ref.nfev)
+
+        assert_raises(ValueError, shgo, test1_1.f, test1_1.bounds,
+                      workers=0)
+
+        # The process pool is only created by the first evaluation
+        SHGOc = SHGO(test1_1.f, test1_1.bounds, workers=2)
+        assert SHGOc.workers.pool is None
+
+    def test_16_2_workers_constraint_args(self):
+        """The constraints get their own arguments in every mode"""
+        def f(x, a):
+            return (x[0] - a) ** 2 + x[1] ** 2
+
+        def g(x, c):
+            return x[0] + x[1] - c
+
+        cons = {'type': 'ineq', 'fun': g, 'args': (1.0,)}
+        kwargs = dict(args=(0.25,), constraints=cons, n=60,
+                      sampling_method='sobol')
+        res_ref = shgo(f, [(0, 1), (0, 1)], **kwargs)
+        numpy.testing.assert_allclose(res_ref.x, [0.625, 0.375], atol=1e-5)
+        for options, workers in [({}, map), ({'vectorized': True}, 1)]:
+            res = shgo(f, [(0, 1), (0, 1)], options=options, workers=workers,
+                       **kwargs)
+            numpy.testing.assert_allclose(res.x, res_ref.x)
+            numpy.testing.assert_equal(res.nfev, res_ref.nfev)
+
+    def test_17_workers_simplicial(self):
+        """New vertices of a generation are mapped over together"""
+        batches = []
+
+        def workers(func, iterable):
+            iterable = list(iterable)
+            batches.append(len(iterable))
+            return map(func, iterable)
+
+        res_ref = shgo(test4_1.f, test4_1.bounds, constraints=test4_1.cons,
+                       iters=3)
+        res = shgo(test4_1.f, test4_1.bounds, constraints=test4_1.cons,
+                   iters=3, workers=workers)
+        numpy.testing.assert_allclose(res.x, res_ref.x)
+        numpy.testing.assert_equal(res.nfev, res_ref.nfev)
+        # The initial hypercube and its centroid in the first batch
+        numpy.testing.assert_equal(batches[0], 2 ** 7 + 1)
+        numpy.testing.assert_equal(len(batches), 2)
+
+    def test_18_eval_store(self, tmpdir):
+        """Reruns reuse the stored objective function values"""
+        calls = []
+
+        def f(x):
+            calls.append(x)
+            return test3_1.f(x)
+
+        options = {'eval_store': str(tmpdir.join('evaluations.db')),
+                   'fingerprint': 'hs18'}
+        for sampling_method in ['sobol', 'simplicial']:
+            res = shgo(f, test3_1.bounds, constraints=test3_1.cons, n=60,
+                       iters=3, sampling_method=sampling_method,
+                       options=options)
+            assert len(calls) > 0
+            del calls[:]
+            res_2 = shgo(f, test3_1.bounds, constraints=test3_1.cons, n=60,
+                         iters=3, sampling_method=sampling_method,
+                         options=options)
+            numpy.testing.assert_equal(len(calls), 0)
+            numpy.testing.assert_allclose(res_2.x, res.x)
+            numpy.testing.assert_equal(res_2.nfev, 0)
+
+            # Values taken from the store by worker processes are no
+            # evaluations either
+            res_3 = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                         n=60, iters=3, sampling_method=sampling_method,
+                         options=options, workers=2)
+            numpy.testing.assert_equal(res_3.nfev, 0)
+            numpy.testing.assert_allclose(res_3.x, res.x)
+
+        # Another objective function is evaluated again
+        options['fingerprint'] = 'hs18_v2'
+        shgo(f, test3_1.bounds, constraints=test3_1.cons, options=options)
+        assert len(calls) > 0
+
+        # The connections are closed when shgo returns, a store object
+        # reconnects when it is used again
+        store = evaluation_store.EvaluationStore(
+            str(tmpdir.join('evaluations.db')), 'hs18')
+        shgo(f, test3_1.bounds, constraints=test3_1.cons, n=60,
+             options={'eval_store': store})
+        numpy.testing.assert_equal(store._connections, [])
+        assert len(store) > 0
+
+        # Values with gradients can not be stored
+        assert_raises(ValueError, shgo, f, test3_1.bounds,
+                      minimizer_kwargs={'jac': True}, options=options)
+
+    def test_19_function_cache(self):
+        """Local minimisations reuse the sampled function values"""
+        for sampling_method in ['sobol', 'simplicial']:
+            calls = []
+
+            def f(x):
+                calls.append(x)
+                return test3_1.f(x)
+
+            res = shgo(f, test3_1.bounds, constraints=test3_1.cons, n=60,
+                       iters=3, sampling_method=sampling_method)
+            numpy.testing.assert_equal(res.nfev, len(calls))
+            numpy.testing.assert_equal(res.cache_misses, len(calls))
+            # At least the starting points of the local minimisations
+            assert res.cache_hits >= len(res.xl)
+
+    def test_20_parallel_split(self):
+        """Cells split by worker processes give the same results"""
+        res_ref = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                       iters=4)
+        res = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                   iters=4, workers=2, options={'parallel_split': True})
+        numpy.testing.assert_array_equal(res.x, res_ref.x)
+        numpy.testing.assert_equal(res.nfev, res_ref.nfev)
+
+    def test_21_refinement(self):
+        """Refining the cells around the minimisers uses fewer evaluations"""
+        res_ref = shgo(test1_1.f, test1_1.bounds, iters=5)
+        res = shgo(test1_1.f, test1_1.bounds, iters=5,
+                   options={'refinement': 'minimisers'})
+        numpy.testing.assert_allclose(res.x, test1_1.expected_x, atol=1e-5)
+        assert res.nfev < res_ref.nfev
+
+        assert_raises(ValueError, shgo, test1_1.f, test1_1.bounds,
+                      options={'refinement': 'minima'})
+
+    def test_22_lazy_complex(self):
+        """The lazy complex finds the global minimum in high dimensions"""
+        res = shgo(test1_1.f, test1_1.bounds, iters=3,
+                   options={'lazy_complex': True})
+        numpy.testing.assert_allclose(res.x, test1_1.expected_x, atol=1e-5)
+
+        # Descending only from the centre finds the minimum at 0.94
+        def f(x):
+            return numpy.sum(numpy.sin(5 * x) + 0.1 * x)
+
+        x_min = -(numpy.pi / 2 + numpy.arcsin(0.02)) / 5
+        res = shgo(f, [(-1, 1)] * 2, iters=3, options={'lazy_complex': True})
+        numpy.testing.assert_allclose(res.x, [x_min] * 2, atol=1e-5)
+        numpy.testing.assert_allclose(res.fun, 2 * f(numpy.array([x_min])))
+
+        # Multimodal in two of 20 dimensions, only the vertices visited by
+        # the descents are evaluated
+        dim = 20
+
+        def g(x):
+            return f(x[:2]) + numpy.sum((x[2:] - 0.3) ** 2)
+
+        res = shgo(g, [(-1, 1)] * dim, n=10, iters=3,
+                   options={'lazy_complex': True})
+        numpy.testing.assert_allclose(res.x, [x_min] * 2 + [0.3] * (dim - 2),
+                                      atol=1e-5)
+        assert res.nfev < 2 ** dim // 10
+
+
+# Sampling point generator tests
+class TestSobolSequence(object):
+    def test_1_bulk_generate(self):
+        """Bulk Gray code generation matches the per-seed generator"""
+        for dim in [1, 2, 7, 40]:
+            for skip in [0, 1, 37]:
+                sobol = sobol_seq.Sobol()
+                points = numpy.array([sobol.i4_sobol(dim, skip + j)[0]
+                                      for j in range(300)])
+                numpy.testing.assert_array_equal(
+                    sobol_seq.Sobol().i4_sobol_generate(dim, 300, skip=skip),
+                    points)
+
+    def test_2_stream(self):
+        """A resumed stream continues the sequence where it stopped"""
+        stream = sobol_seq.SobolStream(3)
+        points = numpy.vstack([stream.next_batch(n) for n in [5, 1, 26]])
+        numpy.testing.assert_array_equal(
+            points, sobol_seq.Sobol().i4_sobol_generate(3, 32, skip=0))
+        numpy.testing.assert_equal(stream.index, 32)
+
+    def test_3_stream_iterations(self):
+        """Every Delaunay iteration only draws the new sampling points"""
+        SHGOc = SHGO(test1_1.f, test1_1.bounds, n=10, iters=3,
+                     sampling_method='sobol')
+        SHGOc.construct_complex()
+        numpy.testing.assert_equal(SHGOc.sampler.index, 30)
+        numpy.testing.assert_equal(SHGOc.C.shape, (30, 2))
+        numpy.testing.assert_array_equal(
+            SHGOc.C, SHGOc.sobol_points(30, 2) * 7.0 - 1.0)
+
+    def test_4_high_dim_skip(self):
+        """High dimensional points can be resumed from any index"""
+        points = sobol_seq.i4_sobol_generate_10k(60, 64)
+        numpy.testing.assert_array_equal(
+            sobol_seq.i4_sobol_generate_10k(60, 20, skip=44), points[44:])
+
+        SHGOc = SHGO(test1_1.f, [(0, 1), ] * 60, n=32)
+        SHGOc.sampling(32, 60)
+        SHGOc.n_sampled = 32
+        SHGOc.sampling(64, 60)
+        numpy.testing.assert_array_equal(SHGOc.C, points)
+
+    def test_5_direction_number_cache(self, tmpdir, monkeypatch):
+        """The direction number table is built once and memory-mapped"""
+        monkeypatch.setenv('SHGO_CACHE_DIR', str(tmpdir))
+        monkeypatch.setattr(sobol_seq, '_joe_kuo', {})
+        points = sobol_seq.i4_sobol_generate_10k(50, 100)
+        assert tmpdir.join(sobol_seq._joe_kuo_npy).check()
+
+        v = sobol_seq.load_joe_kuo_table()
+        assert isinstance(v, numpy.memmap)
+        numpy.testing.assert_array_equal(v, sobol_seq.joe_kuo_table())
+
+        monkeypatch.setattr(sobol_seq, '_joe_kuo', {})
+        numpy.testing.assert_array_equal(
+            sobol_seq.i4_sobol_generate_10k(50, 100), points)
+
+    def test_6_scrambled_substreams(self):
+        """Seeded scrambled streams split into non-overlapping substreams"""
+        points = sobol_seq.SobolStream(3, scramble=True, seed=5).next_batch(64)
+        # Scrambling keeps the stratification of the sequence
+        for i in range(3):
+            numpy.testing.assert_array_equal(
+                numpy.sort(numpy.floor(points[:, i] * 64)), numpy.arange(64))
+
+        streams = sobol_seq.SobolStream(3, scramble=True,
+                                        seed=5).substreams(4, 16)
+        numpy.testing.assert_array_equal(
+            numpy.vstack([s.next_batch(16) for s in streams]), points)
+        assert_raises(ValueError, streams[0].next_batch, 1)
+
+        other = sobol_seq.SobolStream(3, scramble=True, seed=6).next_batch(64)
+        assert not numpy.allclose(points, other)
+
+    def test_7_scrambled_sampling_method(self):
+        """A Sobol stream can be passed as the sampling_method"""
+        stream = sobol_seq.SobolStream(2, scramble=True, seed=1)
+        res = shgo(test1_1.f, test1_1.bounds, sampling_method=stream)
+        numpy.testing.assert_allclose(res.x, test1_1.expected_x, atol=1e-5)
+        numpy.testing.assert_equal(stream.index, 200)
+
+        stream = sobol_seq.SobolStream(3)
+        assert_raises(ValueError, shgo, test1_1.f, test1_1.bounds,
+                      sampling_method=stream)
+
+    def test_8_direction_number_cache_failure(self, tmpdir, monkeypatch):
+        """A table which can not be cached is kept in memory"""
+        monkeypatch.setenv('SHGO_CACHE_DIR', str(tmpdir))
+
+        def replace(src, dst):
+            raise OSError('Read only')
+
+        monkeypatch.setattr(os, 'replace', replace, raising=False)
+        monkeypatch.setattr(os, 'rename', replace)
+        v = sobol_seq.load_joe_kuo_table()
+        assert not isinstance(v, numpy.memmap)
+        numpy.testing.assert_array_equal(v, sobol_seq.joe_kuo_table())
+        # The temporary file is removed
+        numpy.testing.assert_equal(os.listdir(str(tmpdir)), [])
+
+
+class TestSamplers(object):
+    def test_1_samplers_in_unit_cube(self):
+        """Streams continue where they stopped and stratify the unit cube"""
+        for sampler in [samplers.Halton, samplers.Lattice]:
+            points = sampler(3).next_batch(64)
+            stream = sampler(3)
+            numpy.testing.assert_allclose(
+                numpy.vstack([stream.next_batch(n) for n in [10, 54]]), points)
+            # Halton base 2 and every lattice coordinate are 1/64 spaced
+            numpy.testing.assert_allclose(
+                numpy.sort(points[:, 0]), numpy.arange(64) / 64.0)
+
+        points = samplers.LatinHypercube(3, seed=1).next_batch(20)
+        for i in range(3):
+            numpy.testing.assert_array_equal(
+                numpy.sort(numpy.floor(points[:, i] * 20)), numpy.arange(20))
+
+    def test_2_halton_sampling(self):
+        """Halton sampling_method"""
+        run_test(test1_1, sampling_method='halton')
+        run_test(test3_1, sampling_method='halton')
+
+    def test_3_lattice_sampling(self):
+        """Rank-1 lattice sampling_method"""
+        run_test(test1_1, sampling_method='lattice')
+        run_test(test3_1, sampling_method='lattice')
+
+    def test_4_lhs_sampling(self):
+        """Latin hypercube sampling_method"""
+        run_test(test1_1, sampling_method='lhs', options={'seed': 1})
+        run_test(test3_1, sampling_method='lhs', options={'seed': 1})
+
+    def test_5_array_sampler(self):
+        """Sampler objects are scaled to the bounds and return their state"""
+        design = sobol_seq.Sobol().i4_sobol_generate(2, 200)
+        res = shgo(test1_1.f, test1_1.bounds, n=50, iters=3,
+                   sampling_method=samplers.ArraySampler(design))
+        numpy.testing.assert_allclose(res.x, test1_1.expected_x, atol=1e-5)
+        numpy.testing.assert_equal(res.sampler_state, {'index': 150})
+
+        # Resume the design where the previous run stopped
+        sampler = samplers.ArraySampler(design)
+        sampler.set_state(res.sampler_state)
+        numpy.testing.assert_allclose(sampler.next_batch(50), design[150:])
+
+        assert_raises(ValueError, shgo, test1_1.f, test1_1.bounds,
+                      sampling_method=samplers.ArraySampler(design[:, :1]))
+
+        # Samplers must implement next_batch
+        assert_raises(TypeError, samplers.Sampler, 2)
+
+    def test_6_sampling_function(self):
+        """User defined sampling functions return all points scaled"""
+        def sampling_function(n, dim):
+            return sobol_seq.Sobol().i4_sobol_generate(dim, n) * 7 - 1
+
+        run_test(test1_1, sampling_method=sampling_function)
+
+
+class TestSampleStore(object):
+    def test_1_append_grow_compress(self):
+        """Points are appended in place and kept in order"""
+        store = sample_store.SampleStore(2, capacity=4)
+        points = sobol_seq.Sobol().i4_sobol_generate(2, 20)
+        for i in range(0, 20, 5):
+            store.append(points[i:i + 5])
+            store.F[i:] = numpy.arange(i, i + 5)
+        numpy.testing.assert_equal(store.capacity, 32)
+        numpy.testing.assert_array_equal(store.C, points)
+        numpy.testing.assert_array_equal(store.F, numpy.arange(20))
+
+        C = store.C
+        store.compress(points[:, 0] < 0.5)
+        numpy.testing.assert_array_equal(store.C, points[points[:, 0] < 0.5])
+        numpy.testing.assert_array_equal(
+            store.F, numpy.arange(20)[points[:, 0] < 0.5])
+        assert numpy.shares_memory(C, store.C)  # No reallocation
+
+    def test_2_memmap(self, tmpdir):
+        """Memory-mapped stores keep only the current files and clean up"""
+        store = sample_store.SampleStore(2, capacity=4,
+                                         directory=str(tmpdir))
+        points = sobol_seq.Sobol().i4_sobol_generate(2, 20)
+        store.append(points)
+        store.F[:] = numpy.arange(20)
+        assert isinstance(store.C, numpy.memmap)
+        numpy.testing.assert_array_equal(store.C, points)
+        numpy.testing.assert_array_equal(store.F, numpy.arange(20))
+        numpy.testing.assert_equal(len(os.listdir(store.directory)), 2)
+        store.close()
+        numpy.testing.assert_equal(os.listdir(str(tmpdir)), [])
+
+    def test_3_shgo_sample_dir(self, tmpdir):
+        """Memory-mapped sampling points give the in memory results"""
+        res = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                   n=150, iters=2, sampling_method='sobol')
+        res_mm = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                      n=150, iters=2,
+                      sampling_method='sobol',
+                      options={'sample_dir': str(tmpdir)})
+        numpy.testing.assert_array_equal(res_mm.x, res.x)
+        numpy.testing.assert_array_equal(res_mm.xl, res.xl)
+        numpy.testing.assert_equal(res_mm.nfev, res.nfev)
+        numpy.testing.assert_equal(os.listdir(str(tmpdir)), [])
+
+
+class TestVertexStore(object):
+    def test_1_same_complex(self):
+        """The array and object vertex stores build the same complex"""
+        for symmetry in [False, True]:
+            complexes = []
+            for vertex_store in ['objects', 'arrays']:
+                HC = triangulation.Complex(3, test5_1.f, symmetry=symmetry,
+                                           bounds=[(-1, 1)] * 3,
+                                           vertex_store=vertex_store)
+                for _ in range(3):
+                    HC.split_generation()
+                complexes.append(HC)
+
+            HC_o, HC_a = complexes
+            assert list(HC_a.V.cache) == list(HC_o.V.cache)
+            for x in HC_o.V.cache:
+                v_o, v_a = HC_o.V[x], HC_a.V[x]
+                numpy.testing.assert_array_equal(v_a.x_a, v_o.x_a)
+                numpy.testing.assert_equal(v_a.f, v_o.f)
+                assert set(v.x for v in v_a.nn) == set(v.x for v in v_o.nn)
+                assert v_a.minimiser() == v_o.minimiser()
+
+    def test_2_connect(self):
+        """Logged connections apply in order"""
+        V = triangulation.VertexStore(test1_1.f)
+        v = [V[(i / 4.0, 0.0)] for i in range(4)]
+        v[0].connect_all(v[1:])
+        v[1].disconnect(v[0])
+        v[2].disconnect_all(v)
+        v[1].connect(v[0])
+        assert v[0].nn == {v[1], v[3]}
+        assert v[2].nn == set()
+        assert v[3].nn == {v[0]}
+        assert v[0].minimiser()
+        assert not v[3].minimiser()
+
+    def test_3_split_cells(self):
+        """Cells split in chunks give the same complex"""
+        complexes = []
+        for split_workers in [None, map]:
+            HC = triangulation.Complex(3, test5_1.f, bounds=[(-1, 1)] * 3,
+                                       split_workers=split_workers)
+            for _ in range(3):
+                HC.split_generation()
+            complexes.append(HC)
+
+        HC, HC_s = complexes
+        assert list(HC_s.V.cache) == list(HC.V.cache)
+        assert ([[v.x for v in c()] for c in HC_s.H[-1]]
+                == [[v.x for v in c()] for c in HC.H[-1]])
+        for x in HC.V.cache:
+            assert (set(v.x for v in HC_s.V[x].nn)
+                    == set(v.x for v in HC.V[x].nn))
+
+    def test_4_refined_cells(self):
+        """Only the cells near the minimisers are split"""
+        HC = triangulation.Complex(2, test1_1.f, bounds=test1_1.bounds,
+                                   refinement='minimisers',
+                                   refinement_neighbourhood=0)
+        for _ in range(3):
+            split, kept = HC.refined_cells(HC.H[HC.gen])
+            for c in split:
+                assert any(v.minimiser() for v in c())
+            HC.split_generation()
+            # Kept cells are carried over to the next generation
+            assert len(HC.H[HC.gen]) == 2 ** 2 * len(split) + len(kept)
+        assert kept
+
+    def test_5_lattice_keys(self):
+        """Vertices are stored once under their exact lattice point"""
+        HC = triangulation.Complex(2, test1_1.f, bounds=test1_1.bounds)
+        for gen in range(1, 5):
+            HC.split_generation()
+            # The grid of the corners of the cells and their centroids
+            assert len(HC.V.cache) == (2 ** gen + 1) ** 2 + 4 ** gen
+
+        for key, v in HC.V.cache.items():
+            assert v.key is key
+            assert triangulation.lattice_key(v.x) == key
+            assert HC.V[v.x] is v
+        numpy.testing.assert_array_equal(
+            triangulation.lattice_points(list(HC.V.cache))
+            / float(triangulation.LATTICE_SCALE),
+            [v.x for v in HC.V.cache.values()])
+
+        assert_raises(ValueError, triangulation.lattice_key, (0.5, 1.5))
+
+    def test_6_minimisers(self):
+        """The maintained minimisers are those found by checking every vertex"""
+        for vertex_store in ['objects', 'arrays']:
+            HC = triangulation.Complex(2, test5_1.f, bounds=test5_1.bounds,
+                                       vertex_store=vertex_store)
+            for _ in range(4):
+                HC.split_generation()
+                V = HC.V.cache.values()
+                assert ([v.key for v in HC.V.minimisers()]
+                        == [v.key for v in V if v.minimiser()])
+
+            # Connect the first vertex to every other vertex
+            v_0 = list(V)[0]
+            v_0.connect_all(V)
+            assert ([v.key for v in HC.V.minimisers()]
+                    == [v.key for v in V if v.minimiser()])
+
+    def test_7_template_minimisers(self):
+        """Minimisers found for all cells with the template graph"""
+        for split_workers in [None, map]:
+            HC = triangulation.Complex(3, test5_1.f, bounds=[(-1, 1)] * 3,
+                                       split_workers=split_workers)
+            HC_o = triangulation.Complex(3, test5_1.f, bounds=[(-1, 1)] * 3,
+                                         vertex_store='objects')
+            for _ in range(3):
+                assert HC.cell_vertices.shape == (len(HC.H[HC.gen]), 9)
+                assert ([v.key for v in HC.minimisers()]
+                        == [v.key for v in HC_o.minimisers()])
+                HC.split_generation()
+                HC_o.split_generation()
+
+    def test_8_cube_template(self, tmpdir, monkeypatch):
+        """The hypercube triangulation connects all comparable vertices"""
+        for dim in range(1, 6):
+            X, (I, J) = triangulation.cube_template(dim)
+            assert len(X) == 2 ** dim
+            assert set(map(tuple, X.tolist())) == set(
+                itertools.product([0, 1], repeat=dim))
+            pairs = set((i, j) for i in range(len(X)) for j in range(len(X))
+                        if i != j and numpy.all(X[i] <= X[j]))
+            assert set(zip(I.tolist(), J.tolist())) == pairs
+
+        # Stored in and loaded from the template directory
+        triangulation._cube_templates.pop(3)
+        X, (I, J) = triangulation.cube_template(3, str(tmpdir))
+        assert os.path.exists(os.path.join(str(tmpdir), 'n_cube_3.npz'))
+        triangulation._cube_templates.pop(3)
+        X_l, (I_l, J_l) = triangulation.cube_template(3, str(tmpdir))
+        for a, a_l in [(X, X_l), (I, I_l), (J, J_l)]:
+            numpy.testing.assert_array_equal(a, a_l)
+
+        res_ref = shgo(test1_1.f, test1_1.bounds, iters=3)
+        res = shgo(test1_1.f, test1_1.bounds, iters=3,
+                   options={'template_dir': str(tmpdir)})
+        numpy.testing.assert_array_equal(res.x, res_ref.x)
+        assert os.path.exists(os.path.join(str(tmpdir), 'n_cube_2.npz'))
+        assert sorted(os.listdir(str(tmpdir))) == ['n_cube_2.npz',
+                                                  'n_cube_3.npz']
+
+        # A failed write leaves no temporary file behind
+        def replace(src, dst):
+            raise OSError('read only')
+
+        monkeypatch.setattr(os, 'replace', replace)
+        monkeypatch.setattr(os, 'rename', replace)
+        triangulation._cube_templates.pop(4, None)
+        X, (I, J) = triangulation.cube_template(4, str(tmpdir))
+        assert len(X) == 16
+        assert sorted(os.listdir(str(tmpdir))) == ['n_cube_2.npz',
+                                                  'n_cube_3.npz']
+
+    def test_9_lazy_complex(self):
+        """Minimisers of the lazy complex are lower than their neighbours"""
+        def f(x):
+            return numpy.sum(numpy.sin(5 * x) + 0.1 * x)
+
+        HC = triangulation.LazyComplex(3, f, bounds=[(-1, 1)] * 3,
+                                       star_depth=None)
+        for _ in range(3):
+            HC.split_generation()
+            h = 2.0 ** -(HC.gen + 1)
+            minimisers = HC.minimisers()
+            assert minimisers
+            for v in minimisers:
+                nn = set()
+                for e_S in itertools.product([-1, 0, 1], repeat=3):
+                    x = numpy.array(v.x) + h * numpy.array(e_S)
+                    if (len(set(e_S) - {0}) == 1
+                            and numpy.all((x >= 0) & (x <= 1))):
+                        nn.add(HC.V[tuple(x)])
+                        assert v.f < HC.V[tuple(x)].f
+                assert v.nn == nn
+        # Only the visited vertices of the grid are generated
+        assert len(HC.V.cache) < 17 ** 3
+
+    def test_10_sub_cell_template(self):
+        """Sub cells have the vertices and edges of the initial cell"""
+        for dim in [2, 3, 4]:
+            HC = triangulation.Complex(dim, lambda x: numpy.sum(x ** 2))
+            HC.split_generation()
+            HC.split_generation()
+            T = [numpy.array(v.x) for v in HC.C0()[:-1]]
+            nn = dict((v, set()) for v in HC.V.cache.values())
+            for C in HC.H[2]:
+                v_o = numpy.array(triangulation.lattice_coordinates(C.origin))
+                v_s = numpy.array(
+                    triangulation.lattice_coordinates(C.supremum))
+                # The vertices of the template scaled to the cell and the
+                # centroid
+                X = [tuple(v_o - v_o * x + v_s * x) for x in T]
+                X.append(tuple((v_o + v_s) / 2.0))
+                numpy.testing.assert_equal([v.x for v in C()], X)
+                # The edges of the graph of the initial cell
+                for i, c in enumerate(HC.graph):
+                    nn[C()[i]].update(C()[j] for j in c)
+
+            for v in HC.V.cache.values():
+                assert v.nn == nn[v]
+
+    def test_11_refinement_edges(self):
+        """Kept cells keep their edges, hanging vertices are connected"""
+        def f(x):
+            return numpy.sum((x - 0.1) ** 2)
+
+        HC = triangulation.Complex(2, f, refinement='minimisers',
+                                   refinement_neighbourhood=0)
+        HC.split_generation()
+        HC.split_generation()
+        # The cell at the origin is split, its neighbour below (0.5, 0.5)
+        # keeps its edges on their shared face and is connected to the
+        # vertex added in the middle of it
+        assert HC.V[0.5, 0.0] in HC.V[0.5, 0.5].nn
+        assert HC.V[0.5, 0.25] in HC.V[0.75, 0.25].nn
+
+        I, J = HC.graph_edges
+        for dim, vertex_store in [(2, 'arrays'), (2, 'objects'),
+                                  (3, 'arrays')]:
+            HC = triangulation.Complex(dim, f, refinement='minimisers',
+                                       refinement_neighbourhood=0,
+                                       vertex_store=vertex_store)
+            for _ in range(4):
+                HC.split_generation()
+            assert any(c.hanging for c in HC.H[HC.gen])
+            # The edges of the complex are those of the template graphs of
+            # the cells and of their hanging vertices
+            nn = dict((v, set()) for v in HC.V.cache.values())
+            for c in HC.H[HC.gen]:
+                for i, j in zip(*HC.graph_edges):
+                    nn[c()[i]].add(c()[j])
+                    nn[c()[j]].add(c()[i])
+                for h, v in c.hanging_edges:
+                    nn[h].add(v)
+                    nn[v].add(h)
+            for v in HC.V.cache.values():
+                assert v.nn == nn[v]
+            numpy.testing.assert_equal(
+                [v.x for v in HC.V.cache.values() if v.minimiser()],
+                [(0.09375,) * dim])
+
+    def test_12_symmetry_bounds(self):
+        """Vertices of the symmetry complex stay inside the bounds"""
+        for vertex_store in ['objects', 'arrays']:
+            HC = triangulation.Complex(3, test5_1.f, symmetry=True,
+                                       bounds=[(-1, 1)] * 3,
+                                       vertex_store=vertex_store)
+            for _ in range(4):
+                HC.split_generation()
+            X = triangulation.lattice_points(list(HC.V.cache))
+            assert X.min() >= 0
+            assert X.max() <= triangulation.LATTICE_SCALE
+            for v in HC.V.cache.values():
+                assert numpy.all((0.0 <= numpy.asarray(v.x))
+                                 & (numpy.asarray(v.x) <= 1.0))
+                assert numpy.all(numpy.abs(v.x_a) <= 1.0)
+
+    def test_13_add_points(self):
+        """Vertices added together are those of single lattice points"""
+        K = numpy.array([[0, 1], [2, 2], [0, 1], [4, 0]]) * (
+            triangulation.LATTICE_SCALE // 4)
+        for vectorized in [False, True]:
+            V = triangulation.VertexStore(test1_1.f, bounds=test1_1.bounds,
+                                          vectorized=vectorized, capacity=2)
+            V_ref = triangulation.VertexStore(test1_1.f,
+                                              bounds=test1_1.bounds)
+            v = V[(0.5, 0.5)]
+            numpy.testing.assert_equal(V.add_points(K), [1, 0, 1, 2])
+            V.process_pools()
+            for x in [(0.5, 0.5), (0.0, 0.25), (1.0, 0.0)]:
+                v, v_ref = V[x], V_ref[x]
+                assert v.index == v_ref.index
+                numpy.testing.assert_array_equal(v.x_a, v_ref.x_a)
+                numpy.testing.assert_equal(v.f, v_ref.f)
+            assert V.nfev == V_ref.nfev == 3
+
+
+class TestShgoVectorized(object):
+    def test_1_vectorized_sobol(self):
+        """Batches of sampling points are passed to the functions"""
+        shapes = []
+
+        def f(x):
+            shapes.append(numpy.shape(x))
+            return test3_1.f(x)
+
+        res = shgo(f, test3_1.bounds, constraints=test3_1.cons, n=60,
+                   iters=3, sampling_method='sobol',
+                   options={'vectorized': True})
+        res_ref = shgo(test3_1.f, test3_1.bounds, constraints=test3_1.cons,
+                       n=60, iters=3, sampling_method='sobol')
+        numpy.testing.assert_allclose(res.x, res_ref.x)
+        numpy.testing.assert_equal(res.nfev, res_ref.nfev)
+        # The feasible points of the first iteration in one call
+        assert shapes[0] == (2, 117)
+
+    def test_2_vectorized_simplicial(self):
+        """Vertices of a generation are evaluated together"""
+        batches = []
+
+        def f(x):
+            batches.append(numpy.shape(x))
+            return test4_1.f(x)
+
+        res = shgo(f, test4_1.bounds, constraints=test4_1.cons, iters=2,
+                   sampling_method='simplicial',
+                   options={'vectorized': True})
+        res_ref = shgo(test4_1.f, test4_1.bounds, constraints=test4_1.cons,
+                       iters=2, sampling_method='simplicial')
+        numpy.testing.assert_allclose(res.x, res_ref.x)
+        numpy.testing.assert_equal(res.nfev, res_ref.nfev)
+        assert len([s for s in batches if len(s) == 2]) <= 2
+
 
 # Failure test functions
 class TestShgoFailures(object):